@@ -0,0 +1,199 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# --- FRAME-LEVEL FEATURES ---
+# Short-time features for alignment: RMS energy, onset strength (half-wave rectified log-spectral
+# flux) and a 12-bin chroma vector, computed from batched FFTs over a strided view of the signal.
+# The extractor is fed blocks so it works for both the in-memory and the streaming decode paths.
+
+HOP_SECONDS = 0.05
+N_FFT = 4096
+FFT_BATCH = 256 # Frames per batched FFT; bounds the spectrum scratch to a few MB
+CHROMA_FMIN, CHROMA_FMAX = 55.0, 5000.0
+
+def _chroma_matrix(framerate, n_fft):
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / framerate)
+    valid = (freqs >= CHROMA_FMIN) & (freqs <= CHROMA_FMAX)
+    pitch_class = (np.round(12 * np.log2(np.where(valid, freqs, 440.0) / 440.0)).astype(int) + 9) % 12 # C = 0
+    matrix = np.zeros((len(freqs), 12), dtype=np.float32)
+    matrix[np.flatnonzero(valid), pitch_class[valid]] = 1.0
+    return matrix
+
+class FrameFeatureExtractor:
+    def __init__(self, framerate, hop_seconds=HOP_SECONDS, n_fft=N_FFT):
+        self.framerate = framerate
+        self.hop = max(1, int(round(framerate * hop_seconds)))
+        self.n_fft = n_fft
+        self._window = np.hanning(n_fft).astype(np.float32)
+        self._chroma = _chroma_matrix(framerate, n_fft)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._prev_log_mag = None
+        self._rms, self._onset, self._chroma_rows = [], [], []
+
+    def add(self, block):
+        samples = np.concatenate((self._pending, np.asarray(block, dtype=np.float32)))
+        n_frames = (len(samples) - self.n_fft) // self.hop + 1 if len(samples) >= self.n_fft else 0
+        if n_frames:
+            frames = sliding_window_view(samples, self.n_fft)[::self.hop][:n_frames]
+            for b0 in range(0, n_frames, FFT_BATCH):
+                self._process(frames[b0:b0 + FFT_BATCH])
+        self._pending = samples[n_frames * self.hop:].copy()
+
+    def _process(self, frames):
+        self._rms.append(np.sqrt(np.mean(np.square(frames), axis=1)).astype(np.float32))
+        magnitude = np.abs(np.fft.rfft(frames * self._window, axis=1)).astype(np.float32)
+        log_mag = np.log1p(100.0 * magnitude)
+        previous = log_mag[:1] if self._prev_log_mag is None else self._prev_log_mag
+        flux = np.diff(np.concatenate((previous, log_mag)), axis=0)
+        self._onset.append(np.maximum(flux, 0.0).sum(axis=1))
+        self._prev_log_mag = log_mag[-1:]
+        chroma = np.square(magnitude) @ self._chroma
+        self._chroma_rows.append(chroma / np.maximum(chroma.max(axis=1, keepdims=True), 1e-10))
+
+    def features(self):
+        if not self._rms and len(self._pending):
+            self.add(np.zeros(self.n_fft - len(self._pending), dtype=np.float32)) # Shorter than one frame
+        empty = np.zeros(0, dtype=np.float32)
+        return {
+            "frame_rate": self.framerate / self.hop,
+            "frame_rms": np.concatenate(self._rms) if self._rms else empty,
+            "frame_onset": np.concatenate(self._onset) if self._onset else empty,
+            "frame_chroma": np.concatenate(self._chroma_rows) if self._chroma_rows else np.zeros((0, 12), dtype=np.float32),
+        }
+
+def frame_features(samples, framerate, block_frames=1 << 18):
+    extractor = FrameFeatureExtractor(framerate)
+    for start in range(0, len(samples), block_frames):
+        extractor.add(samples[start:start + block_frames])
+    return extractor.features()
+
+
+# --- MULTISCALE BANDED DTW ---
+# FastDTW-style: align coarsened copies of both sequences, project the path one level up and
+# only evaluate cells within `radius` of it. Each level is a banded DTW whose rows are solved with
+# a vectorized min-plus prefix scan, so time and memory stay O(N * band) instead of O(N * M).
+
+DTW_RADIUS = 16
+DTW_MIN_SIZE = 128 # Below this many frames the coarsest level is solved without a band
+SILENCE_DB = 40.0 # Leading/trailing frames this far below the loudest frame are trimmed
+SECTION_SECONDS = 30.0
+MAX_SECTIONS = 12
+
+def _banded_dtw(X, Y, lo, hi):
+    # The band is stored jagged: row i occupies D[offsets[i]:offsets[i + 1]] and covers columns
+    # lo[i]..hi[i] - 1, so one wide row (e.g. around a pause) doesn't widen every other row
+    n = len(X)
+    offsets = np.concatenate(([0], np.cumsum(hi - lo)))
+    D = np.empty(offsets[-1])
+    for i in range(n):
+        l, h, o = lo[i], hi[i], offsets[i]
+        cost = np.sqrt(np.sum(np.square(Y[l:h] - X[i]), axis=1))
+        cumulative = np.cumsum(cost)
+        if i == 0:
+            D[:h - l] = cumulative # lo[0] == 0: the path starts at (0, 0)
+            continue
+        pl, ph, po = lo[i - 1], hi[i - 1], offsets[i - 1]
+        reach = np.full(h - l, np.inf) # Best predecessor from the previous row (vertical or diagonal)
+        s0, s1 = max(l, pl), min(h, ph)
+        if s1 > s0: reach[s0 - l:s1 - l] = D[po + s0 - pl:po + s1 - pl]
+        s0, s1 = max(l, pl + 1), min(h, ph + 1)
+        if s1 > s0: reach[s0 - l:s1 - l] = np.minimum(reach[s0 - l:s1 - l], D[po + s0 - 1 - pl:po + s1 - 1 - pl])
+        # D[j] = cost[j] + min(reach[j], D[j-1]) unrolled: D = S + running min of (reach - S_prev)
+        D[o:o + h - l] = cumulative + np.minimum.accumulate(reach - (cumulative - cost))
+    return _backtrack(D, offsets, lo, hi)
+
+def _backtrack(D, offsets, lo, hi):
+    def at(i, j):
+        return D[offsets[i] + j - lo[i]] if i >= 0 and lo[i] <= j < hi[i] else np.inf
+    i, j = len(lo) - 1, hi[-1] - 1
+    path = [(i, j)]
+    while i > 0 or j > 0:
+        steps = ((at(i - 1, j - 1), i - 1, j - 1), (at(i - 1, j), i - 1, j), (at(i, j - 1), i, j - 1))
+        _, i, j = min(steps, key=lambda step: step[0])
+        path.append((i, j))
+    return np.array(path[::-1], dtype=np.int64)
+
+def _halve(X):
+    if len(X) % 2: X = np.concatenate((X, X[-1:]))
+    return 0.5 * (X[0::2] + X[1::2])
+
+def _project_window(path, n, m, radius):
+    lo, hi = np.full(n, m, dtype=np.int64), np.zeros(n, dtype=np.int64)
+    for offset in (0, 1):
+        rows = np.minimum(2 * path[:, 0] + offset, n - 1)
+        np.minimum.at(lo, rows, 2 * path[:, 1])
+        np.maximum.at(hi, rows, 2 * path[:, 1] + 2)
+    if radius:
+        padded_lo = np.pad(lo, radius, mode="edge"); padded_hi = np.pad(hi, radius, mode="edge")
+        lo = sliding_window_view(padded_lo, 2 * radius + 1).min(axis=1) - radius
+        hi = sliding_window_view(padded_hi, 2 * radius + 1).max(axis=1) + radius
+    lo, hi = np.clip(lo, 0, m), np.clip(hi, 1, m)
+    lo[0], hi[-1] = 0, m
+    lo = np.minimum.accumulate(lo[::-1])[::-1]; hi = np.maximum.accumulate(hi)
+    lo[1:] = np.minimum(lo[1:], hi[:-1]) # Consecutive rows must overlap for the path to continue
+    return lo, hi
+
+def fast_dtw(X, Y, radius=DTW_RADIUS):
+    n, m = len(X), len(Y)
+    if min(n, m) <= DTW_MIN_SIZE:
+        return _banded_dtw(X, Y, np.zeros(n, dtype=np.int64), np.full(n, m, dtype=np.int64))
+    coarse_path = fast_dtw(_halve(X), _halve(Y), radius)
+    return _banded_dtw(X, Y, *_project_window(coarse_path, n, m, radius))
+
+def sakoe_chiba_dtw(X, Y, radius=DTW_RADIUS):
+    # Fixed band around the (length-normalised) diagonal; cheaper but cannot absorb large offsets
+    n, m = len(X), len(Y)
+    centre = np.round(np.arange(n) * (m - 1) / max(n - 1, 1)).astype(np.int64)
+    lo, hi = np.clip(centre - radius, 0, m), np.clip(centre + radius + 1, 1, m)
+    lo[0], hi[-1] = 0, m
+    lo[1:] = np.minimum(lo[1:], hi[:-1])
+    return _banded_dtw(X, Y, lo, hi)
+
+
+# --- PERFORMANCE COMPARISON ---
+def _to_db(rms):
+    return 20 * np.log10(np.maximum(rms, 1e-6))
+
+def _standardize(values):
+    return (values - values.mean()) / (values.std() + 1e-9)
+
+def _alignment_matrix(features):
+    chroma = features["frame_chroma"]
+    chroma = chroma / np.maximum(np.linalg.norm(chroma, axis=1, keepdims=True), 1e-9)
+    loudness = _standardize(_to_db(features["frame_rms"]))[:, None]
+    onset = _standardize(np.log1p(features["frame_onset"]))[:, None]
+    return np.hstack((chroma, 0.5 * loudness, 0.5 * onset)).astype(np.float64)
+
+def _active_range(rms_db):
+    active = np.flatnonzero(rms_db >= rms_db.max() - SILENCE_DB)
+    return (int(active[0]), int(active[-1]) + 1) if len(active) else (0, len(rms_db))
+
+def align_performances(benchmark_features, user_features, radius=DTW_RADIUS):
+    bench_db, user_db = _to_db(benchmark_features["frame_rms"]), _to_db(user_features["frame_rms"])
+    if len(bench_db) < 2 or len(user_db) < 2: return None
+    bench_fps, user_fps = benchmark_features["frame_rate"], user_features["frame_rate"]
+    b0, b1 = _active_range(bench_db)
+    u0, u1 = _active_range(user_db)
+    path = fast_dtw(_alignment_matrix(benchmark_features)[b0:b1], _alignment_matrix(user_features)[u0:u1], radius)
+    path_bench, path_user = path[:, 0] + b0, path[:, 1] + u0
+
+    # Sections are cut on the benchmark's timeline; the path maps each boundary onto the user's take
+    active_seconds = (b1 - b0) / bench_fps
+    n_sections = int(np.clip(round(active_seconds / SECTION_SECONDS), 1, MAX_SECTIONS))
+    bounds = np.linspace(b0, b1, n_sections + 1).round().astype(np.int64)
+    first_match = np.searchsorted(path_bench, bounds[:-1])
+    last_match = np.searchsorted(path_bench, bounds[1:], side="left") - 1
+    user_start, user_end = path_user[first_match], path_user[np.maximum(last_match, first_match)]
+    bench_seconds = np.diff(bounds) / bench_fps
+    user_seconds = np.maximum(user_end - user_start + 1, 1) / user_fps
+    dynamics_db = np.array([user_db[path_user[s:e + 1]].mean() - bench_db[path_bench[s:e + 1]].mean()
+                            for s, e in zip(first_match, np.maximum(last_match, first_match))])
+    return {
+        "section_start": bounds[:-1] / bench_fps, "section_end": bounds[1:] / bench_fps,
+        "user_section_start": user_start / user_fps, "user_section_end": (user_end + 1) / user_fps,
+        "tempo_ratio": bench_seconds / user_seconds, # > 1: the user played this section faster
+        "dynamics_db": dynamics_db, # > 0: the user played this section louder
+        "start_offset": u0 / user_fps - b0 / bench_fps, # > 0: the user started later after the recording began
+        "path_seconds": np.column_stack((path_bench / bench_fps, path_user / user_fps)),
+    }
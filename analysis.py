@@ -0,0 +1,140 @@
+import io
+
+import numpy as np
+from pydub import AudioSegment
+
+from feature_cache import feature_key
+from waveform import overview_envelope_features
+from audio_stream import stream_audio_features
+from alignment import align_performances, frame_features
+from pitch import IN_TUNE_CENTS, compare_intonation, pitch_features
+from profiling import stage
+
+
+# --- AUDIO ANALYSIS & COMPARISON ---
+# Everything here is independent of Streamlit so the web app and the batch CLI share one pipeline.
+# Failures raise; callers decide how to surface them.
+
+ANALYSIS_PARAMS = {"version": 7, "channels": 1}
+STREAMING_THRESHOLD_BYTES = 32 * 1024**2 # Larger PCM inputs are analysed block by block without keeping the waveform
+COMPRESSION_RATIO_ESTIMATE = 8 # Compressed uploads expand roughly this much when decoded
+
+def decode_audio_features(audio_bytes):
+    with stage("decode") as record:
+        sound = AudioSegment.from_file(io.BytesIO(audio_bytes))
+        sound = sound.set_channels(ANALYSIS_PARAMS["channels"]) # Mono for consistent analysis
+        record["samples"] = int(sound.frame_count())
+    n = record["samples"]
+    with stage("get_array_of_samples", samples=n):
+        audio_array = np.array(sound.get_array_of_samples())
+    framerate = sound.frame_rate
+    with stage("normalize", samples=n):
+        # float32 halves the cached waveform; two threshold-sized recordings fit the app's memory tier
+        normalized_audio = audio_array.astype(np.float32) / np.float32(2**(sound.sample_width * 8 - 1))
+    with stage("stats", samples=n):
+        duration = len(normalized_audio) / framerate
+        avg_amplitude = float(np.mean(np.abs(normalized_audio), dtype=np.float64))
+        peak_amplitude = float(np.max(np.abs(normalized_audio)))
+    with stage("envelope", samples=n):
+        envelope = overview_envelope_features(normalized_audio)
+    with stage("frame_features", samples=n):
+        frames = frame_features(normalized_audio, framerate)
+    with stage("pitch", samples=n):
+        pitch = pitch_features(normalized_audio, framerate)
+    return {
+        "waveform": normalized_audio, "framerate": framerate, "duration": duration,
+        "avg_amplitude": avg_amplitude, "peak_amplitude": peak_amplitude,
+        **envelope, **frames, **pitch
+    }
+
+def extract_audio_features(audio_bytes, streaming=None, cache=None, digest=None):
+    # With streaming=True, audio_bytes may also be a file path (memory-mapped for PCM WAV); pass its digest when caching
+    if streaming is None:
+        decoded_size_estimate = len(audio_bytes) * (1 if audio_bytes[:4] == b"RIFF" else COMPRESSION_RATIO_ESTIMATE)
+        streaming = decoded_size_estimate > STREAMING_THRESHOLD_BYTES
+    decode = stream_audio_features if streaming else decode_audio_features
+    with stage("analyze_audio_features"):
+        if cache is None: return decode(audio_bytes)
+        with stage("cache_key"):
+            key = feature_key(audio_bytes, digest=digest, streaming=streaming, **ANALYSIS_PARAMS)
+        return cache.get_or_compute(key, lambda: decode(audio_bytes))
+
+def _format_time(seconds):
+    return f"{int(seconds // 60)}:{int(seconds % 60):02d}"
+
+def _describe_cents(cents, reference):
+    if abs(cents) < 5: return f"in tune with {reference}"
+    return f"{abs(cents):.0f} cents {'sharp' if cents > 0 else 'flat'} of {reference}"
+
+def _describe_sections(alignment, section_cents=None):
+    lines = []
+    if section_cents is None: section_cents = np.full(len(alignment["section_start"]), np.nan)
+    for start, end, tempo, dynamics, cents in zip(alignment["section_start"], alignment["section_end"], alignment["tempo_ratio"], alignment["dynamics_db"], section_cents):
+        pace = "on tempo" if 0.95 <= tempo <= 1.05 else f"{abs(tempo - 1) * 100:.0f}% {'faster' if tempo > 1 else 'slower'}"
+        pitch = "" if np.isnan(cents) else f", {_describe_cents(cents, 'the benchmark')}"
+        lines.append(f"- {_format_time(start)}–{_format_time(end)}: {pace}, {abs(dynamics):.1f} dB {'louder' if dynamics >= 0 else 'quieter'}{pitch}")
+    return "\n".join(lines)
+
+def _describe_intonation(intonation):
+    user, bench = intonation["user"], intonation["benchmark"]
+    if not user["notes"]: return "**Intonation:** No clearly pitched notes were detected in your recording."
+    text = (f"**Intonation:** {user['in_tune_fraction'] * 100:.0f}% of your playing time was within {IN_TUNE_CENTS:.0f} cents of equal temperament, "
+            f"with notes off by {user['mean_abs_cents']:.0f} cents on average and {_describe_cents(user['bias_cents'], 'equal temperament')} overall")
+    if bench["notes"]: text += f" (benchmark: {bench['in_tune_fraction'] * 100:.0f}% within {IN_TUNE_CENTS:.0f} cents, {bench['mean_abs_cents']:.0f} cents on average)"
+    text += "."
+    if intonation["vs_benchmark_cents"] is not None:
+        text += (f" Following the benchmark note by note, your pitch was typically {intonation['vs_benchmark_abs_cents']:.0f} cents away from it "
+                 f"and {_describe_cents(intonation['vs_benchmark_cents'], 'it')} on balance.")
+    if user["vibrato_rate"] is None:
+        text += "\n\n**Vibrato:** No sustained vibrato was detected in your recording."
+    else:
+        text += (f"\n\n**Vibrato:** Used on {user['vibrato_fraction'] * 100:.0f}% of your playing time, "
+                 f"at {user['vibrato_rate']:.1f} Hz and ±{user['vibrato_cents']:.0f} cents")
+        if bench["vibrato_rate"] is not None: text += f" (benchmark: {bench['vibrato_rate']:.1f} Hz, ±{bench['vibrato_cents']:.0f} cents)"
+        text += "."
+    return text
+
+def compare_performances(benchmark_features, user_features):
+    with stage("alignment", samples=len(benchmark_features.get("frame_rms", ())) + len(user_features.get("frame_rms", ()))):
+        alignment = align_performances(benchmark_features, user_features) if "frame_rms" in benchmark_features and "frame_rms" in user_features else None
+    if alignment:
+        # Medians over aligned sections, so a late start or a single pause doesn't decide the verdict
+        tempo_ratio, dynamics_db = float(np.median(alignment["tempo_ratio"])), float(np.median(alignment["dynamics_db"]))
+    else:
+        tempo_ratio = benchmark_features["duration"] / user_features["duration"]
+        dynamics_db = float(20 * np.log10(max(user_features["avg_amplitude"], 1e-9) / max(benchmark_features["avg_amplitude"], 1e-9)))
+    with stage("intonation"):
+        intonation = compare_intonation(benchmark_features, user_features, alignment)
+    return {"tempo_ratio": tempo_ratio, "dynamics_db": dynamics_db, "alignment": alignment, "intonation": intonation}
+
+def get_human_comparative_analysis(benchmark_features, user_features, comparison=None):
+    if not benchmark_features or not user_features: return "Could not analyze one or both audio files."
+    if comparison is None:
+        with stage("get_human_comparative_analysis"):
+            comparison = compare_performances(benchmark_features, user_features)
+    tempo_ratio, dynamics_db, alignment, intonation = comparison["tempo_ratio"], comparison["dynamics_db"], comparison["alignment"], comparison.get("intonation")
+    dyn_comp = "very similar to"
+    if dynamics_db > 20 * np.log10(1.15): dyn_comp = "generally louder and more powerful than"
+    elif dynamics_db < 20 * np.log10(0.85): dyn_comp = "quieter and more reserved than"
+    tempo_comp = "at a very similar tempo to"
+    if tempo_ratio > 1 / 0.95: tempo_comp = "significantly faster than"
+    elif tempo_ratio < 1 / 1.05: tempo_comp = "significantly slower than"
+    durations = f"{user_features['duration']:.1f} seconds compared to the benchmark's {benchmark_features['duration']:.1f} seconds"
+    if alignment:
+        # The verdicts are medians over aligned sections; say so, since pauses and silences skew the totals
+        tempo_reason = (f"Matching the two performances passage by passage, your typical pace was {tempo_ratio * 100:.0f}% of the benchmark's "
+                        f"(your whole recording runs {durations}, which also counts pauses and silence)")
+        dynamics_reason = f"Passage by passage, you were typically {abs(dynamics_db):.1f} dB {'louder' if dynamics_db >= 0 else 'quieter'} than the benchmark"
+    else:
+        tempo_reason = f"Your recording takes {durations}"
+        dynamics_reason = (f"This is reflected in the average loudness of your recording ({user_features['avg_amplitude']:.2f}) "
+                           f"versus the goal ({benchmark_features['avg_amplitude']:.2f})")
+    feedback = (f"**Tempo:** You played this piece **{tempo_comp}** the benchmark. {tempo_reason}.\n\n"
+                f"**Dynamics:** Your performance was **{dyn_comp}** the benchmark. {dynamics_reason}.\n\n"
+                f"**Tonal Quality:** Based on the waveforms, your peak amplitudes are {'higher' if user_features['peak_amplitude'] > benchmark_features['peak_amplitude'] else 'lower'} than the benchmark, suggesting a difference in attack and bow pressure.")
+    if intonation: feedback += f"\n\n{_describe_intonation(intonation)}"
+    if alignment:
+        if abs(alignment["start_offset"]) >= 1.0:
+            feedback += f"\n\n**Start:** Your playing begins {abs(alignment['start_offset']):.1f} seconds {'later' if alignment['start_offset'] > 0 else 'earlier'} into the recording than the benchmark's; the comparison below ignores that gap."
+        feedback += f"\n\n**Section by section** (benchmark timeline, after aligning the two performances):\n{_describe_sections(alignment, intonation['section_cents'] if intonation else None)}"
+    return feedback
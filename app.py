@@ -1,11 +1,18 @@
 import streamlit as st
-import time
-import io
-import wave
-import numpy as np
-import matplotlib.pyplot as plt
+import os
+import json
+import tempfile
+from contextlib import nullcontext
 from datetime import datetime
-from pydub import AudioSegment
+from streamlit_webrtc import webrtc_streamer, WebRtcMode
+from feature_cache import FeatureCache
+from waveform import plot_waveform
+from repertoire_search import RepertoireIndex
+from live_capture import RingBufferRecorder
+from recording_store import RecordingStore, SessionHandle
+from profiling import Profiler, stage
+from analysis import extract_audio_features, get_human_comparative_analysis
+from audio_stream import read_pcm_window
 
 # --- THE COMPLETE DATABASE (NO ABBREVIATIONS) ---
 pieceDatabase = {
@@ -59,110 +66,152 @@ pieceDatabase = {
     "mendelssohn_violin_concerto_3": { "composer": "Felix Mendelssohn", "title": "Violin Concerto, Op. 64: III. Allegro molto vivace", "keywords": ["mendelssohn", "concerto", "vivace"], "duration": "06:50", "description": "The finale of Mendelssohn's Violin Concerto is a light, sparkling, and virtuosic Allegro molto vivace. It has a scherzo-like character, with a sense of playful energy and elfin grace that is characteristic of Mendelssohn's style. The movement is a brilliant showcase for the soloist's agility and technical skill, with rapid passagework and a light, crisp bowing style. It brings the concerto to a joyful and exhilarating conclusion.", "usualTempo": 168, "practiceTempo": 134 },
 }
 
-# --- HELPER FUNCTIONS --- (Unchanged)
-def fetch_piece_info(piece_name):
-    if not piece_name: return None
-    search_terms = piece_name.lower().split()
-    for key, piece in pieceDatabase.items():
-        searchable_text = f"{piece['title'].lower()} {piece['composer'].lower()} {' '.join(piece['keywords'])}"
-        if all(term in searchable_text for term in search_terms):
-            return piece
+# --- HELPER FUNCTIONS ---
+@st.cache_resource
+def get_repertoire_index():
+    return RepertoireIndex(pieceDatabase)
+
+def search_pieces(piece_name, limit=5):
+    if not piece_name: return []
+    results = get_repertoire_index().search(piece_name, limit=limit)
+    full_matches = [key for key, _, matched_all in results if matched_all]
+    return [pieceDatabase[key] for key in (full_matches or [key for key, _, _ in results])]
+
+def piece_not_found(piece_name):
     return {"title": piece_name, "description": f"Information for '{piece_name}' could not be found.", "composer": "Unknown", "notFound": True}
 
-def analyze_audio_features(audio_bytes):
-    if not audio_bytes: return None
+FEATURE_CACHE_DIR = os.environ.get("VIOLIN_STUDIO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "violin_studio_features"))
+
+@st.cache_resource
+def get_feature_cache():
+    return FeatureCache(max_entries=8, max_memory_bytes=256 * 1024**2, disk_dir=FEATURE_CACHE_DIR or None)
+
+def analyze_audio_features(audio_id, streaming=None):
+    if not audio_id: return None
     try:
-        sound = AudioSegment.from_file(io.BytesIO(audio_bytes))
-        sound = sound.set_channels(1) # Mono for consistent analysis
-        audio_array = np.array(sound.get_array_of_samples())
-        framerate = sound.frame_rate
-        normalized_audio = audio_array / (2**(sound.sample_width * 8 - 1))
-        duration = len(normalized_audio) / framerate
-        avg_amplitude = np.mean(np.abs(normalized_audio))
-        peak_amplitude = np.max(np.abs(normalized_audio))
-        return {
-            "waveform": normalized_audio, "framerate": framerate, "duration": duration,
-            "avg_amplitude": avg_amplitude, "peak_amplitude": peak_amplitude
-        }
+        audio = get_recording_store().open(audio_id) # Memory-mapped; the digest doubles as the cache key
+        return extract_audio_features(audio, streaming=streaming, cache=get_feature_cache(), digest=audio_id)
     except Exception as e:
         st.error(f"Could not process audio file. It might be corrupted. Error: {e}")
         return None
 
-def get_human_comparative_analysis(benchmark_features, user_features):
-    if not benchmark_features or not user_features: return "Could not analyze one or both audio files."
-    dyn_comp = "very similar to"
-    if user_features["avg_amplitude"] > benchmark_features["avg_amplitude"] * 1.15: dyn_comp = "generally louder and more powerful than"
-    elif user_features["avg_amplitude"] < benchmark_features["avg_amplitude"] * 0.85: dyn_comp = "quieter and more reserved than"
-    duration_ratio = user_features["duration"] / benchmark_features["duration"]
-    tempo_comp = "at a very similar tempo to"
-    if duration_ratio < 0.95: tempo_comp = "significantly faster than"
-    elif duration_ratio > 1.05: tempo_comp = "significantly slower than"
-    return (f"**Tempo:** You played this piece **{tempo_comp}** the benchmark, taking {user_features['duration']:.1f} seconds compared to the benchmark's {benchmark_features['duration']:.1f} seconds.\n\n"
-            f"**Dynamics:** Your performance was **{dyn_comp}** the benchmark. This is reflected in the average loudness of your recording ({user_features['avg_amplitude']:.2f}) versus the goal ({benchmark_features['avg_amplitude']:.2f}).\n\n"
-            f"**Tonal Quality:** Based on the waveforms, your peak amplitudes are {'higher' if user_features['peak_amplitude'] > benchmark_features['peak_amplitude'] else 'lower'} than the benchmark, suggesting a difference in attack and bow pressure.")
-
-def plot_waveform(features, title, color):
-    fig, ax = plt.subplots(figsize=(10, 2))
-    time_axis = np.linspace(0, features["duration"], num=len(features["waveform"]))
-    ax.plot(time_axis, features["waveform"], color=color, linewidth=0.5)
-    ax.set_title(title, color='white'); ax.set_xlabel("Time (s)", color='white')
-    ax.set_ylabel("Amplitude", color='white'); ax.set_ylim([-1, 1])
-    ax.grid(True, alpha=0.2, color='#888888'); ax.tick_params(colors='white', which='both')
-    fig.patch.set_facecolor('none'); ax.set_facecolor('none')
-    return fig
+def recording_window_reader(audio_id):
+    # Streamed analyses don't keep the waveform; deep zooms into a WAV re-read just that window from the mapped blob
+    return lambda start, end: read_pcm_window(get_recording_store().open(audio_id), start, end)
+
+RECORDING_STORE_DIR = os.environ.get("VIOLIN_STUDIO_STORE_DIR", os.path.join(tempfile.gettempdir(), "violin_studio_recordings"))
+
+@st.cache_resource
+def get_recording_store():
+    return RecordingStore(RECORDING_STORE_DIR)
+
+# --- PROFILING ---
+# VIOLIN_STUDIO_PROFILE=1 times every run, =memory also traces allocations (process-wide, so slow).
+# With VIOLIN_STUDIO_DEBUG_TOKEN set, a single session can opt into timings via ?debug=<token>.
+PROFILE_MODE = os.environ.get("VIOLIN_STUDIO_PROFILE", "")
+DEBUG_TOKEN = os.environ.get("VIOLIN_STUDIO_DEBUG_TOKEN")
+
+def new_profiler():
+    enabled = PROFILE_MODE in ("1", "memory") or (DEBUG_TOKEN and st.query_params.get("debug") == DEBUG_TOKEN)
+    return Profiler(trace_memory=PROFILE_MODE == "memory") if enabled else None
+
+def profiling(profiler):
+    return profiler.activate() if profiler else nullcontext()
+
+def show_profile_panel(profiles):
+    with st.expander("Performance Profile (debug)"):
+        for label, profiler in profiles.items():
+            st.write(f"**{label}**")
+            st.dataframe(profiler.summary(), use_container_width=True)
+        st.download_button("Download profile JSON", data=json.dumps([profiler.export(run=label) for label, profiler in profiles.items()], indent=2, default=float),
+                           file_name="violin_studio_profile.json", mime="application/json")
 
 # --- STATE INITIALIZATION & HELPERS ---
 def init_state():
     if 'initialized' not in st.session_state:
         st.session_state.initialized = True
         st.session_state.search_query = ''; st.session_state.searched_piece_info = None
-        st.session_state.user_audio_bytes = None
-        st.session_state.benchmark_audio_bytes = None; st.session_state.ai_feedback = ""
+        st.session_state.search_results = []
+        st.session_state.recording_session = SessionHandle(get_recording_store())
+        st.session_state.user_audio_id = None
+        st.session_state.benchmark_audio_id = None; st.session_state.ai_feedback = ""
         st.session_state.analysis_error = ''; st.session_state.analysis_complete = False
         st.session_state.benchmark_history = []; st.session_state.user_history = []
-        st.session_state.audio_frames = []; st.session_state.volume_level = 0.0
+        st.session_state.volume_level = 0
 
-def add_to_history(history_key, audio_bytes, source_name):
+def sync_recording_references():
+    # Tells the store which recordings this session still points at; unreferenced blobs are deleted
+    audio_ids = [st.session_state.get(f"{type_key}_audio_id") for type_key in ("benchmark", "user")]
+    audio_ids += [record["audio_id"] for type_key in ("benchmark", "user") for record in st.session_state.get(f"{type_key}_history", [])]
+    get_recording_store().set_references(st.session_state.recording_session.id, audio_ids)
+
+def add_to_history(history_key, audio_id, source_name):
     history = st.session_state[history_key]
     timestamp = datetime.now().strftime("%H:%M:%S")
-    history.insert(0, {"timestamp": timestamp, "audio": audio_bytes, "name": source_name})
+    history.insert(0, {"timestamp": timestamp, "audio_id": audio_id, "name": source_name})
     st.session_state[history_key] = history[:5]
+    sync_recording_references()
+
+def set_current_audio(type_key, audio_bytes, source_name):
+    audio_id = get_recording_store().put(audio_bytes, owner=st.session_state.recording_session.id)
+    st.session_state[f"{type_key}_audio_id"] = audio_id
+    add_to_history(f"{type_key}_history", audio_id, source_name)
+
+def show_recording(audio_id):
+    # st.audio copies the file into Streamlit's in-memory media storage, so only call this for players on screen
+    path = get_recording_store().path(audio_id)
+    if os.path.exists(path): st.audio(path)
+    else: st.caption("This recording has expired.")
+
+def show_history(type_key):
+    # One player at a time, loaded on request, keeps per-session media memory to the current takes plus one
+    playing_key = f"{type_key}_history_playing"
+    for i, record in enumerate(st.session_state[f"{type_key}_history"]):
+        entry = f"{i}:{record['audio_id']}"
+        label_col, button_col = st.columns([4, 1])
+        label_col.write(f"{record['name']} ({record['timestamp']})")
+        if button_col.button("Play", key=f"{type_key}_history_play_{i}"): st.session_state[playing_key] = entry
+        if st.session_state.get(playing_key) == entry: show_recording(record['audio_id'])
+
+LEVEL_REFRESH_SECONDS = 0.25
+
+@st.fragment(run_every=LEVEL_REFRESH_SECONDS)
+def show_level_meter(recorder):
+    # Nothing reruns the script while WebRTC is streaming, so the meter polls the recorder on its own
+    st.session_state.volume_level = recorder.level_percent()
+    st.progress(st.session_state.volume_level, text=f"Recording... level {st.session_state.volume_level}%, peak {recorder.peak_percent()}% ({recorder.recorded_seconds:.0f}s of {recorder.max_seconds // 60} min max)")
 
 def create_audio_input_section(title, type_key):
     st.subheader(title)
     with st.expander(f"Upload an Audio File"):
         uploaded_file = st.file_uploader(f"Upload {type_key.capitalize()} Audio", type=['wav', 'mp3', 'm4a'], key=f"{type_key}_uploader")
         if uploaded_file:
-            audio_bytes = uploaded_file.getvalue()
-            if audio_bytes != st.session_state.get(f"{type_key}_audio_bytes"):
-                st.session_state[f"{type_key}_audio_bytes"] = audio_bytes
-                add_to_history(f"{type_key}_history", audio_bytes, uploaded_file.name)
+            upload_id = getattr(uploaded_file, "file_id", None) or (uploaded_file.name, uploaded_file.size)
+            if upload_id != st.session_state.get(f"{type_key}_upload_id"):
+                st.session_state[f"{type_key}_upload_id"] = upload_id
+                set_current_audio(type_key, uploaded_file.getvalue(), uploaded_file.name)
                 st.rerun()
     with st.expander(f"Record Live Audio"):
-        webrtc_ctx = webrtc_streamer(key=f"{type_key}_recorder", mode=WebRtcMode.SENDONLY, audio_frame_callback=audio_frame_callback, media_stream_constraints={"audio": True, "video": False})
-        if webrtc_ctx.state.playing:
-            st.progress(st.session_state.get("volume_level", 0), text=f"Recording... {st.session_state.get('volume_level', 0)}%")
-        if not webrtc_ctx.state.playing and len(st.session_state.get("audio_frames", [])) > 0:
-            wav_buffer = io.BytesIO()
-            with wave.open(wav_buffer, 'wb') as wf:
-                wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(48000)
-                wf.writeframes(b''.join(st.session_state.audio_frames))
-            st.session_state[f"{type_key}_audio_bytes"] = wav_buffer.getvalue()
-            st.session_state.audio_frames = [] # Clear buffer
-            add_to_history(f"{type_key}_history", st.session_state[f"{type_key}_audio_bytes"], "Live Recording")
+        if f"{type_key}_recorder_buffer" not in st.session_state:
+            st.session_state[f"{type_key}_recorder_buffer"] = RingBufferRecorder()
+        recorder = st.session_state[f"{type_key}_recorder_buffer"]
+        webrtc_ctx = webrtc_streamer(key=f"{type_key}_recorder", mode=WebRtcMode.SENDONLY, audio_frame_callback=recorder.audio_frame_callback, media_stream_constraints={"audio": True, "video": False})
+        if webrtc_ctx.state.playing: show_level_meter(recorder)
+        if not webrtc_ctx.state.playing and recorder.has_audio():
+            source_name = f"Live Recording (last {recorder.max_seconds // 60} min)" if recorder.truncated else "Live Recording"
+            set_current_audio(type_key, recorder.take_wav_bytes(), source_name)
             st.rerun()
-    if st.session_state.get(f"{type_key}_audio_bytes"):
+    if st.session_state.get(f"{type_key}_audio_id"):
         st.write(f"**Current {type_key.capitalize()}:**")
-        st.audio(st.session_state[f"{type_key}_audio_bytes"])
+        show_recording(st.session_state[f"{type_key}_audio_id"])
     if st.session_state.get(f"{type_key}_history"):
         with st.expander("View History (Last 5)"):
-            for record in st.session_state[f"{type_key}_history"]:
-                st.write(f"{record['name']} ({record['timestamp']})")
-                st.audio(record['audio'])
+            show_history(type_key)
 
 # --- MAIN APP LAYOUT ---
 st.set_page_config(layout="centered", page_title="Violin Studio")
 init_state()
+sync_recording_references() # Also marks the session as active so its recordings aren't expired
 
 st.markdown("""
     <style>
@@ -183,7 +232,16 @@ with tab1:
     st.header("Musical Repertoire Explorer")
     search_query = st.text_input("Search for a piece:", placeholder="e.g., Vivaldi Four Seasons")
     if st.button("Search", key="search_piece"):
-        st.session_state.searched_piece_info = fetch_piece_info(search_query)
+        st.session_state.search_query = search_query
+        st.session_state.search_results = search_pieces(search_query)
+        if st.session_state.search_results: st.session_state.searched_piece_info = st.session_state.search_results[0]
+        else: st.session_state.searched_piece_info = piece_not_found(search_query) if search_query else None
+    search_results = st.session_state.get("search_results", [])
+    if len(search_results) > 1:
+        labels = [f"{piece['title']} — {piece['composer']}" for piece in search_results]
+        # Keyed on the query so a new search starts from its top result instead of the old selection index
+        choice = st.selectbox("Matching pieces:", range(len(labels)), format_func=lambda i: labels[i], key=f"search_choice_{st.session_state.search_query}")
+        st.session_state.searched_piece_info = search_results[choice]
     if st.session_state.searched_piece_info:
         info = st.session_state.searched_piece_info
         st.divider()
@@ -201,17 +259,18 @@ with tab2:
 
     st.divider()
 
-    if st.session_state.benchmark_audio_bytes and st.session_state.user_audio_bytes:
+    if st.session_state.benchmark_audio_id and st.session_state.user_audio_id:
         if st.button("Compare Recordings", type="primary", use_container_width=True):
             st.session_state.ai_feedback, st.session_state.analysis_error = "", ""
-            with st.spinner("AI is analyzing your performance... This may take a moment."):
-                benchmark_features = analyze_audio_features(st.session_state.benchmark_audio_bytes)
-                user_features = analyze_audio_features(st.session_state.user_audio_bytes)
-                time.sleep(2)
+            profiler = new_profiler()
+            with st.spinner("AI is analyzing your performance... This may take a moment."), profiling(profiler):
+                benchmark_features = analyze_audio_features(st.session_state.benchmark_audio_id)
+                user_features = analyze_audio_features(st.session_state.user_audio_id)
                 if benchmark_features and user_features: 
                     st.session_state.ai_feedback = get_human_comparative_analysis(benchmark_features, user_features)
                 else: 
                     st.session_state.analysis_error = "Could not process one or both audio files."
+            st.session_state.compare_profiler = profiler
             st.session_state.analysis_complete = True
             st.rerun()
     
@@ -229,10 +288,19 @@ with tab2:
         st.subheader("Comparative Analysis", anchor="analysis-section")
         if st.session_state.analysis_error: st.error(st.session_state.analysis_error)
         if st.session_state.ai_feedback:
-            benchmark_features = analyze_audio_features(st.session_state.benchmark_audio_bytes)
-            user_features = analyze_audio_features(st.session_state.user_audio_bytes)
-            if benchmark_features and user_features:
-                c1, c2 = st.columns(2)
-                c1.pyplot(plot_waveform(benchmark_features, "Benchmark Waveform", "#FFFF00"))
-                c2.pyplot(plot_waveform(user_features, "Your Waveform", "#FFFFFF"))
+            render_profiler = new_profiler()
+            with profiling(render_profiler):
+                benchmark_features = analyze_audio_features(st.session_state.benchmark_audio_id)
+                user_features = analyze_audio_features(st.session_state.user_audio_id)
+                if benchmark_features and user_features:
+                    max_duration = float(max(benchmark_features["duration"], user_features["duration"]))
+                    zoom = st.slider("Zoom (seconds)", 0.0, max_duration, (0.0, max_duration), key="waveform_zoom")
+                    c1, c2 = st.columns(2)
+                    benchmark_fig = plot_waveform(benchmark_features, "Benchmark Waveform", "#FFFF00", zoom, recording_window_reader(st.session_state.benchmark_audio_id))
+                    user_fig = plot_waveform(user_features, "Your Waveform", "#FFFFFF", zoom, recording_window_reader(st.session_state.user_audio_id))
+                    with stage("st.pyplot"):
+                        c1.pyplot(benchmark_fig); c2.pyplot(user_fig)
             st.markdown(st.session_state.ai_feedback)
+            if render_profiler:
+                profiles = {"Compare": st.session_state.get("compare_profiler"), "Results render": render_profiler}
+                show_profile_panel({label: profiler for label, profiler in profiles.items() if profiler})
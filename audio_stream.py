@@ -0,0 +1,226 @@
+import io
+import os
+import struct
+import subprocess
+import threading
+
+import numpy as np
+
+from waveform import DETAIL_BINS, OVERVIEW_BINS, downsample_envelope
+from alignment import FrameFeatureExtractor
+from pitch import PitchTracker
+from profiling import stage
+
+
+# --- STREAMING, BOUNDED-MEMORY DECODE ---
+# Long recordings are analysed block by block instead of materialising the whole signal.
+# PCM WAV input is viewed in place (np.frombuffer over the uploaded bytes, or np.memmap for a
+# file on disk); anything else is decoded by an ffmpeg subprocess writing 16-bit mono WAV to a
+# pipe that is read in fixed-size blocks. Only one block is ever converted to float at a time.
+
+FFMPEG_BINARY = os.environ.get("FFMPEG_BINARY", "ffmpeg")
+BLOCK_FRAMES = 1 << 16
+HEADER_PROBE_BYTES = 1 << 16 # WAV headers (including any metadata chunks) must fit in this prefix
+_PCM_DTYPES = {1: np.uint8, 2: np.dtype("<i2"), 4: np.dtype("<i4")}
+_WAVE_FORMAT_PCM, _WAVE_FORMAT_EXTENSIBLE = 1, 0xFFFE
+
+def _read_exact(stream, n):
+    data = stream.read(n)
+    if len(data) != n: raise ValueError("Truncated WAV header")
+    return data
+
+def read_wav_header(stream):
+    # Returns (format_tag, channels, framerate, sample_width, data_size); leaves stream at the data.
+    # WAVE_FORMAT_EXTENSIBLE is resolved to the tag in its SubFormat GUID (e.g. 1 = PCM, 3 = float)
+    riff, _, wave_id = struct.unpack("<4sI4s", _read_exact(stream, 12))
+    if riff != b"RIFF" or wave_id != b"WAVE": raise ValueError("Not a RIFF/WAVE stream")
+    fmt = None
+    while True:
+        chunk_id, chunk_size = struct.unpack("<4sI", _read_exact(stream, 8))
+        if chunk_id == b"fmt ":
+            body = _read_exact(stream, chunk_size + (chunk_size & 1))
+            format_tag, channels, framerate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+            if format_tag == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40: # cbSize >= 22
+                format_tag = struct.unpack("<H", body[24:26])[0]
+            fmt = (format_tag, channels, framerate, bits // 8)
+        elif chunk_id == b"data":
+            if fmt is None: raise ValueError("WAV data chunk before fmt chunk")
+            return (*fmt, chunk_size)
+        else:
+            _read_exact(stream, chunk_size + (chunk_size & 1))
+
+def _to_mono_float(raw, channels, sample_width):
+    block = raw.astype(np.float32)
+    if sample_width == 1: block -= 128.0 # 8-bit WAV is unsigned
+    block /= 2**(sample_width * 8 - 1)
+    if channels > 1: block = block.reshape(-1, channels).mean(axis=1)
+    return block
+
+def _pcm_wav_view(source):
+    # Zero-copy integer view of a PCM WAV's samples, or None if it must go through ffmpeg
+    try:
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                format_tag, channels, framerate, sample_width, data_size = read_wav_header(f)
+                offset = f.tell()
+        else:
+            stream = io.BytesIO(memoryview(source)[:HEADER_PROBE_BYTES]) # Header only; don't copy mmaps
+            format_tag, channels, framerate, sample_width, data_size = read_wav_header(stream)
+            offset = stream.tell()
+    except (ValueError, struct.error):
+        return None
+    if format_tag != _WAVE_FORMAT_PCM or sample_width not in _PCM_DTYPES: return None
+    dtype = np.dtype(_PCM_DTYPES[sample_width])
+    total = os.path.getsize(source) if isinstance(source, (str, os.PathLike)) else len(source)
+    frames = min(data_size, total - offset) // (dtype.itemsize * channels)
+    if isinstance(source, (str, os.PathLike)):
+        samples = np.memmap(source, dtype=dtype, mode="r", offset=offset, shape=(frames * channels,))
+    else:
+        samples = np.frombuffer(source, dtype=dtype, count=frames * channels, offset=offset)
+    return samples, channels, framerate, sample_width
+
+def read_pcm_window(source, start_seconds, end_seconds):
+    # Mono float samples for one time window of a PCM WAV, converting only that window; None if not PCM WAV
+    view = _pcm_wav_view(source)
+    if view is None: return None
+    samples, channels, framerate, sample_width = view
+    f0, f1 = max(0, int(start_seconds * framerate)), int(np.ceil(end_seconds * framerate))
+    return _to_mono_float(samples[f0 * channels:f1 * channels], channels, sample_width)
+
+def _iter_pcm_blocks(samples, channels, sample_width, block_frames):
+    step = block_frames * channels
+    for start in range(0, len(samples), step):
+        yield _to_mono_float(samples[start:start + step], channels, sample_width)
+
+def _feed_stdin(proc, source):
+    try:
+        view = memoryview(source)
+        for start in range(0, len(view), 1 << 20):
+            proc.stdin.write(view[start:start + (1 << 20)])
+    except (BrokenPipeError, ValueError):
+        pass # ffmpeg exited early; its return code reports the failure
+    finally:
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+
+def _iter_ffmpeg_blocks(source, block_frames):
+    from_path = isinstance(source, (str, os.PathLike))
+    # cache: makes the piped input seekable, which demuxers need for e.g. an .m4a with its index at the end
+    cmd = [FFMPEG_BINARY, "-hide_banner", "-v", "error", "-i", os.fspath(source) if from_path else "cache:pipe:0",
+           "-vn", "-ac", "1", "-acodec", "pcm_s16le", "-f", "wav", "pipe:1"]
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL if from_path else subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    feeder = None if from_path else threading.Thread(target=_feed_stdin, args=(proc, source), daemon=True)
+    if feeder: feeder.start()
+    try:
+        try:
+            _, channels, framerate, sample_width, _ = read_wav_header(proc.stdout)
+        except (ValueError, struct.error):
+            proc.wait()
+            raise ValueError(f"ffmpeg could not decode the audio: {proc.stderr.read().decode(errors='replace').strip()}") from None
+        yield framerate
+        frame_bytes = channels * sample_width
+        while True:
+            chunk = proc.stdout.read(block_frames * frame_bytes)
+            if not chunk: break
+            chunk = chunk[:len(chunk) - len(chunk) % frame_bytes]
+            yield _to_mono_float(np.frombuffer(chunk, dtype=_PCM_DTYPES[sample_width]), channels, sample_width)
+        if proc.wait() != 0:
+            raise ValueError(f"ffmpeg failed while decoding: {proc.stderr.read().decode(errors='replace').strip()}")
+    finally:
+        if proc.poll() is None: proc.kill()
+        proc.wait()
+        if feeder: feeder.join()
+        proc.stdout.close(); proc.stderr.close()
+
+def iter_audio_blocks(source, block_frames=BLOCK_FRAMES):
+    # Yields the framerate first, then mono float32 blocks of at most block_frames samples
+    view = _pcm_wav_view(source)
+    if view is None:
+        yield from _iter_ffmpeg_blocks(source, block_frames)
+        return
+    samples, channels, framerate, sample_width = view
+    yield framerate
+    yield from _iter_pcm_blocks(samples, channels, sample_width, block_frames)
+
+
+class StreamingFeatureAccumulator:
+    # Running duration, mean |x|, peak, frame-level alignment and pitch features and a min/max/sum-of-squares
+    # envelope. The envelope has a fixed capacity: when it fills, neighbouring bins are merged
+    # pairwise and the bin width doubles. It is reported at two levels, an overview and a detail
+    # level for zooming, since the samples themselves aren't kept.
+    def __init__(self, framerate, max_bins=4 * DETAIL_BINS, samples_per_bin=64):
+        self.framerate = framerate
+        self.samples_per_bin = samples_per_bin
+        self.n_samples = 0
+        self.abs_sum = 0.0
+        self.peak = 0.0
+        self._min = np.empty(max_bins, dtype=np.float32)
+        self._max = np.empty(max_bins, dtype=np.float32)
+        self._sq = np.empty(max_bins, dtype=np.float64)
+        self._bins = 0
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._frames = FrameFeatureExtractor(framerate)
+        self._pitch = PitchTracker(framerate)
+
+    def add(self, block):
+        if not len(block): return
+        self._frames.add(block)
+        self._pitch.add(block)
+        magnitude = np.abs(block)
+        self.n_samples += len(block)
+        self.abs_sum += float(magnitude.sum(dtype=np.float64))
+        self.peak = max(self.peak, float(magnitude.max()))
+        samples = np.concatenate((self._pending, block)) if len(self._pending) else block
+        pos, capacity = 0, len(self._min)
+        while True:
+            rows = min((len(samples) - pos) // self.samples_per_bin, capacity - self._bins)
+            if rows:
+                frame = samples[pos:pos + rows * self.samples_per_bin].reshape(rows, self.samples_per_bin)
+                b0, b1 = self._bins, self._bins + rows
+                self._min[b0:b1] = frame.min(axis=1); self._max[b0:b1] = frame.max(axis=1)
+                self._sq[b0:b1] = np.square(frame, dtype=np.float64).sum(axis=1)
+                self._bins, pos = b1, pos + rows * self.samples_per_bin
+            if self._bins == capacity:
+                self._merge_pairs()
+            elif len(samples) - pos < self.samples_per_bin:
+                break
+        self._pending = samples[pos:].copy()
+
+    def _merge_pairs(self):
+        half = self._bins // 2
+        self._min[:half] = self._min[:self._bins].reshape(half, 2).min(axis=1)
+        self._max[:half] = self._max[:self._bins].reshape(half, 2).max(axis=1)
+        self._sq[:half] = self._sq[:self._bins].reshape(half, 2).sum(axis=1)
+        self._bins, self.samples_per_bin = half, self.samples_per_bin * 2
+
+    def features(self):
+        counts = np.full(self._bins, self.samples_per_bin, dtype=np.float64)
+        env_min, env_max, env_sq = self._min[:self._bins], self._max[:self._bins], self._sq[:self._bins]
+        if len(self._pending):
+            env_min = np.append(env_min, self._pending.min()); env_max = np.append(env_max, self._pending.max())
+            env_sq = np.append(env_sq, np.square(self._pending, dtype=np.float64).sum())
+            counts = np.append(counts, len(self._pending))
+        envelope = {"min": env_min.copy(), "max": env_max.copy(),
+                    "rms": np.sqrt(env_sq / np.maximum(counts, 1)).astype(np.float32)}
+        detail = downsample_envelope(envelope, DETAIL_BINS)
+        envelope = downsample_envelope(detail, 2 * OVERVIEW_BINS)
+        return {
+            "framerate": self.framerate, "duration": self.n_samples / self.framerate if self.framerate else 0.0,
+            "avg_amplitude": self.abs_sum / self.n_samples if self.n_samples else 0.0, "peak_amplitude": self.peak,
+            "envelope_min": envelope["min"], "envelope_max": envelope["max"], "envelope_rms": envelope["rms"],
+            "envelope_detail_min": detail["min"], "envelope_detail_max": detail["max"], "envelope_detail_rms": detail["rms"],
+            **self._frames.features(), **self._pitch.features(),
+        }
+
+def stream_audio_features(source, block_frames=BLOCK_FRAMES):
+    # Decode and accumulation interleave block by block, so they are profiled as one stage
+    with stage("stream_analysis") as record:
+        blocks = iter_audio_blocks(source, block_frames)
+        accumulator = StreamingFeatureAccumulator(next(blocks))
+        for block in blocks:
+            accumulator.add(block)
+        record["samples"] = accumulator.n_samples
+        return accumulator.features()
@@ -0,0 +1,124 @@
+# Per-stage throughput benchmark for the analysis pipeline on synthetic violin-like recordings.
+# Run from the repository root:
+#   python -m benchmarks.pipeline_benchmark                          # 30 s, 5 min, 30 min; mono + stereo; WAV + MP3
+#   python -m benchmarks.pipeline_benchmark --durations 30 --json bench.json
+#   python -m benchmarks.pipeline_benchmark --baseline bench.json    # exit 1 if any stage got >25% slower
+# MP3 cases and the pydub decode path need ffmpeg on PATH; they are reported as skipped otherwise.
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import wave
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from analysis import compare_performances, extract_audio_features
+from audio_stream import FFMPEG_BINARY
+from profiling import Profiler, stage
+from waveform import plot_waveform
+
+SAMPLE_RATE = 44100
+HARMONICS = 1.0 / np.arange(1, 9) ** 1.2
+
+def _violin_note(f0, seconds, rng):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    vibrato = 0.25 * np.sin(2 * np.pi * rng.uniform(5.0, 6.5) * t) * np.clip(t / 0.3, 0, 1) # semitones, delayed onset
+    phase = 2 * np.pi * np.cumsum(f0 * 2 ** (vibrato / 12)) / SAMPLE_RATE
+    tone = np.sin(np.outer(phase, np.arange(1, len(HARMONICS) + 1))) @ HARMONICS
+    envelope = np.minimum(1.0, t / 0.04) * np.minimum(1.0, (seconds - t) / 0.06)
+    bow_noise = 0.02 * rng.standard_normal(len(t))
+    return (0.25 * envelope * (tone + bow_noise)).astype(np.float32)
+
+def write_synthetic_wav(path, seconds, channels, seed=0):
+    # Generated note by note and streamed to disk, so a 30-minute stereo file never sits in memory
+    rng = np.random.default_rng(seed)
+    written, total = 0, int(seconds * SAMPLE_RATE)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(channels); wf.setsampwidth(2); wf.setframerate(SAMPLE_RATE)
+        while written < total:
+            note = _violin_note(196.0 * 2 ** (rng.integers(0, 30) / 12), rng.uniform(0.25, 1.2), rng)[:total - written]
+            frames = np.column_stack([note * gain for gain in (1.0, 0.8)[:channels]])
+            wf.writeframes((np.clip(frames, -1, 1) * 32767).astype("<i2").tobytes())
+            written += len(note)
+    return path
+
+def to_mp3(wav_path):
+    mp3_path = wav_path[:-4] + ".mp3"
+    subprocess.run([FFMPEG_BINARY, "-v", "error", "-y", "-i", wav_path, "-b:a", "192k", mp3_path], check=True)
+    return mp3_path
+
+def run_case(path, trace_memory, include_decode):
+    profiler = Profiler(trace_memory=trace_memory)
+    with open(path, "rb") as f:
+        audio = f.read()
+    with profiler.activate():
+        features = extract_audio_features(audio, streaming=True)
+        if include_decode: extract_audio_features(audio, streaming=False)
+        compare_performances(features, features)
+        fig = plot_waveform(features, "Benchmark", "#FFFF00")
+        with stage("pyplot_serialize"): # What st.pyplot does with the figure
+            fig.savefig(io.BytesIO(), format="png"); plt.close(fig)
+    return profiler.summary()
+
+def compare_to_baseline(results, baseline, tolerance):
+    previous = {(row["case"], row["stage"]): row for row in baseline}
+    regressions = []
+    for row in results:
+        old = previous.get((row["case"], row["stage"]))
+        if old and old.get("samples_per_s") and row.get("samples_per_s") and row["samples_per_s"] < old["samples_per_s"] * (1 - tolerance):
+            regressions.append(f"{row['case']} {row['stage']}: {row['samples_per_s']:.3g} samples/s vs baseline {old['samples_per_s']:.3g}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage throughput benchmark for the Violin Studio analysis pipeline.")
+    parser.add_argument("--durations", type=float, nargs="+", default=[30, 300, 1800], help="Recording lengths in seconds.")
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 2], choices=[1, 2])
+    parser.add_argument("--formats", nargs="+", default=["wav", "mp3"], choices=["wav", "mp3"])
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc peak-memory tracking (lower overhead).")
+    parser.add_argument("--json", help="Write results to this file.")
+    parser.add_argument("--baseline", help="Earlier --json output to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed throughput drop before a stage counts as regressed.")
+    args = parser.parse_args()
+
+    have_ffmpeg = shutil.which(FFMPEG_BINARY) is not None
+    results = []
+    print(f"{'case':<18} {'stage':<42} {'wall s':>8} {'Msamples/s':>11} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for seconds in args.durations:
+            for channels in args.channels:
+                wav_path = write_synthetic_wav(os.path.join(workdir, f"violin_{int(seconds)}s_{channels}ch.wav"), seconds, channels)
+                for fmt in args.formats:
+                    case = f"{int(seconds)}s/{'mono' if channels == 1 else 'stereo'}/{fmt}"
+                    if fmt == "mp3" and not have_ffmpeg:
+                        print(f"{case:<18} skipped (ffmpeg not found)")
+                        continue
+                    path = to_mp3(wav_path) if fmt == "mp3" else wav_path
+                    for row in run_case(path, not args.no_memory, include_decode=have_ffmpeg):
+                        row = {"case": case, **row}
+                        results.append(row)
+                        rate = f"{row['samples_per_s'] / 1e6:.2f}" if row["samples_per_s"] else "-"
+                        peak = f"{row['peak_memory_bytes'] / 1e6:.1f}" if row["peak_memory_bytes"] is not None else "-"
+                        print(f"{case:<18} {row['stage']:<42} {row['wall_s']:>8.3f} {rate:>11} {peak:>8}")
+                    if fmt == "mp3": os.remove(path)
+                os.remove(wav_path)
+    if not have_ffmpeg: print("ffmpeg not found: the pydub decode path and MP3 cases were skipped.", file=sys.stderr)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        for line in regressions: print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# Query-latency microbenchmark for the repertoire index against the old linear scan.
+# Run from the repository root:  python -m benchmarks.search_benchmark [--sizes 50 500 5000 50000]
+import argparse
+import random
+import time
+
+from repertoire_search import RepertoireIndex
+
+COMPOSERS = ["Antonio Vivaldi", "Johannes Brahms", "Camille Saint-Saëns", "Arvo Pärt", "Frédéric Chopin",
+             "Felix Mendelssohn", "Pyotr Ilyich Tchaikovsky", "Claude Debussy", "Antonín Dvořák", "Béla Bartók"]
+FORMS = ["Sonata", "Concerto", "Romance", "Nocturne", "Serenade", "Caprice", "Partita", "Étude", "Fantasia", "Méditation"]
+MOVEMENTS = ["Allegro", "Adagio", "Largo", "Presto", "Andante", "Vivace", "Scherzo", "Minuetto", "Finale", "Rondo"]
+SYLLABLES = ["ka", "lo", "mi", "ra", "ven", "sol", "tur", "bel", "dor", "ish", "qua", "zen", "pho", "gri"]
+QUERIES = ["vivaldi allegro", "saint saens", "part", "brahms concerto adagio", "tchaikovksy", "dvorak romance",
+           "sonata no 3", "meditation", "bartok caprice", "op 12"]
+
+def synthetic_catalog(size, seed=0):
+    rng = random.Random(seed)
+    catalog = {}
+    for i in range(size):
+        composer = rng.choice(COMPOSERS) if i < 50 else f"{rng.choice(SYLLABLES).title()}{rng.choice(SYLLABLES)} {rng.choice(COMPOSERS).split()[-1]}"
+        title = f"{rng.choice(FORMS)} No. {rng.randint(1, 12)}, Op. {rng.randint(1, 120)}: {rng.choice(MOVEMENTS)}"
+        word = "".join(rng.choice(SYLLABLES) for _ in range(3))
+        catalog[f"piece_{i}"] = {"composer": composer, "title": title, "keywords": [composer.split()[-1].lower(), word]}
+    return catalog
+
+def linear_scan(catalog, query):
+    # The pre-index fetch_piece_info loop, kept for comparison
+    search_terms = query.lower().split()
+    for piece in catalog.values():
+        searchable_text = f"{piece['title'].lower()} {piece['composer'].lower()} {' '.join(piece['keywords'])}"
+        if all(term in searchable_text for term in search_terms):
+            return piece
+    return None
+
+def time_queries(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for query in QUERIES: fn(query)
+    return (time.perf_counter() - start) / (repeats * len(QUERIES)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Query-latency microbenchmark for the repertoire index against the old linear scan.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000, 50000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    print(f"{'pieces':>8} {'build ms':>10} {'index us/query':>16} {'scan us/query':>15}")
+    for size in args.sizes:
+        catalog = synthetic_catalog(size)
+        start = time.perf_counter()
+        index = RepertoireIndex(catalog)
+        build_ms = (time.perf_counter() - start) * 1e3
+        indexed = time_queries(lambda q: index.search(q, limit=10), args.repeats)
+        scanned = time_queries(lambda q: linear_scan(catalog, q), max(1, args.repeats // 4))
+        print(f"{size:>8} {build_ms:>10.1f} {indexed:>16.1f} {scanned:>15.1f}")
+
+if __name__ == "__main__":
+    main()
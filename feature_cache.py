@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+
+
+# --- CONTENT-ADDRESSED FEATURE CACHE ---
+# Features are keyed by a hash of the raw audio bytes plus the analysis parameters, so the
+# same recording analysed the same way is only ever decoded once. Two tiers: a small in-memory
+# LRU bounded by entry count and array bytes, and an optional directory of .npz files that is
+# trimmed back under a byte budget (least recently used first) whenever it grows past it.
+
+def content_digest(audio_bytes):
+    return hashlib.sha256(audio_bytes).hexdigest()
+
+def file_digest(path, chunk_bytes=1 << 20):
+    # Same digest as content_digest(open(path).read()) without holding the file in memory
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_bytes), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def feature_key(audio_bytes=None, digest=None, **params):
+    # Pass the digest when it is already known (e.g. from the recording store) to skip rehashing
+    h = hashlib.sha256((digest or content_digest(audio_bytes)).encode("ascii"))
+    h.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+def _features_nbytes(features):
+    return sum(v.nbytes for v in features.values() if isinstance(v, np.ndarray))
+
+
+class FeatureCache:
+    def __init__(self, max_entries=8, max_memory_bytes=256 * 1024**2, disk_dir=None, max_disk_bytes=1024**3):
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = 0
+        if disk_dir: os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+        features = self._load(key)
+        if features is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, features)
+        return features
+
+    def put(self, key, features):
+        self._remember(key, features)
+        self._store(key, features)
+        return features
+
+    def get_or_compute(self, key, compute):
+        features = self.get(key)
+        if features is None:
+            features = compute()
+            if features is not None: self.put(key, features)
+        return features
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear(); self._memory_bytes = 0
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(".npz"): os.remove(os.path.join(self.disk_dir, name))
+
+    # --- MEMORY TIER ---
+    def _remember(self, key, features):
+        size = _features_nbytes(features)
+        if size > self.max_memory_bytes: return # Would evict everything else; disk tier only
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= _features_nbytes(self._memory.pop(key))
+            self._memory[key] = features
+            self._memory_bytes += size
+            while len(self._memory) > self.max_entries or self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= _features_nbytes(evicted)
+
+    # --- DISK TIER ---
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.npz")
+
+    def _load(self, key):
+        if not self.disk_dir: return None
+        path = self._path(key)
+        try:
+            features = {}
+            with np.load(path, allow_pickle=False) as data:
+                for name in data.files:
+                    value = data[name] # Each access re-reads the member from the archive
+                    features[name] = value.item() if value.ndim == 0 else value
+            os.utime(path) # Mark as recently used for eviction
+            return features
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, zipfile.BadZipFile):
+            # Truncated or corrupt entry: drop it so the features are recomputed instead of failing every rerun
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _store(self, key, features):
+        if not self.disk_dir: return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp" # Unique across threads and batch worker processes
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **{name: np.asarray(value) for name, value in features.items()})
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".npz"): continue
+            try:
+                stat = os.stat(os.path.join(self.disk_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes: break
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except OSError:
+                pass
+            total -= size
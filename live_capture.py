@@ -0,0 +1,124 @@
+import io
+import threading
+import wave
+
+import numpy as np
+
+
+# --- LIVE CAPTURE RING BUFFER ---
+# The WebRTC audio callback runs on its own thread and hands us one short av.AudioFrame at a time.
+# Frames are copied into a single int16 ring buffer, sized for the maximum take length when the
+# first frame reveals the stream's sample rate and channel count, so a long take costs no
+# per-frame allocations or list growth. Once full, the oldest audio is overwritten. Each frame
+# updates an exponentially smoothed RMS level and a decaying held peak for the recording meter.
+
+MAX_TAKE_SECONDS = 10 * 60
+LEVEL_FLOOR_DB = -60.0 # Level meter reads 0% at or below this RMS level
+RMS_SMOOTHING = 0.8 # Weight of the previous mean square per frame (~100 ms time constant at 20 ms frames)
+PEAK_DECAY = 0.9 # Per-frame decay of the held peak
+
+def _meter_percent(level):
+    if level <= 0.0: return 0
+    db = 20 * np.log10(level)
+    return int(np.clip((db - LEVEL_FLOOR_DB) / -LEVEL_FLOOR_DB, 0.0, 1.0) * 100)
+
+class RingBufferRecorder:
+    def __init__(self, max_seconds=MAX_TAKE_SECONDS):
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._buffer = None
+        self._scratch = np.empty(0, dtype=np.float32)
+        self.sample_rate = self.channels = None
+        self._write_pos = self._filled = 0
+        self.truncated = False
+        self.dropped_frames = 0
+        self.mean_square = self.peak = 0.0
+
+    # --- CALLBACK THREAD ---
+    def audio_frame_callback(self, frame):
+        samples = frame.to_ndarray()
+        channels = len(frame.layout.channels)
+        if frame.format.is_planar: samples = samples.T # (channels, n) -> (n, channels)
+        samples = samples.reshape(-1)
+        with self._lock:
+            if self._buffer is None:
+                self._allocate(frame.sample_rate, channels)
+            elif (frame.sample_rate, channels) != (self.sample_rate, self.channels):
+                self.dropped_frames += 1 # The stream changed format mid-take; keep the take consistent
+                return frame
+            self._write(samples)
+            self._update_level(samples)
+        return frame
+
+    def _allocate(self, sample_rate, channels):
+        self.sample_rate, self.channels = sample_rate, channels
+        self._buffer = np.empty(int(self.max_seconds * sample_rate) * channels, dtype=np.int16)
+        self._write_pos = self._filled = 0
+
+    def _write(self, samples):
+        n, size = len(samples), len(self._buffer)
+        if n > size: samples, n = samples[-size:], size
+        if samples.dtype.kind == "f":
+            scaled = self._scratch_view(n)
+            np.multiply(samples, 32767.0, out=scaled)
+            np.clip(scaled, -32768, 32767, out=scaled)
+            samples = scaled
+        first = min(n, size - self._write_pos)
+        self._buffer[self._write_pos:self._write_pos + first] = samples[:first]
+        self._buffer[:n - first] = samples[first:]
+        self._write_pos = (self._write_pos + n) % size
+        if self._filled + n > size: self.truncated = True
+        self._filled = min(size, self._filled + n)
+
+    def _scratch_view(self, n):
+        if len(self._scratch) < n: self._scratch = np.empty(n, dtype=np.float32) # Grows once to the frame size
+        return self._scratch[:n]
+
+    def _update_level(self, samples):
+        if not len(samples): return
+        if samples.dtype.kind == "f":
+            normalized = samples
+        else:
+            normalized = self._scratch_view(len(samples))
+            np.multiply(samples, 1.0 / 32768.0, out=normalized)
+        frame_mean_square = float(np.dot(normalized, normalized) / len(normalized))
+        self.mean_square = RMS_SMOOTHING * self.mean_square + (1 - RMS_SMOOTHING) * frame_mean_square
+        self.peak = max(float(np.max(np.abs(normalized))), self.peak * PEAK_DECAY)
+
+    # --- SCRIPT THREAD ---
+    @property
+    def recorded_seconds(self):
+        with self._lock:
+            return self._filled / (self.sample_rate * self.channels) if self._buffer is not None else 0.0
+
+    def level_percent(self):
+        with self._lock:
+            return _meter_percent(np.sqrt(self.mean_square))
+
+    def peak_percent(self):
+        with self._lock:
+            return _meter_percent(self.peak)
+
+    def has_audio(self):
+        with self._lock:
+            return self._filled > 0
+
+    def take_wav_bytes(self):
+        # Copies the take out in chronological order as a WAV, then releases the buffer
+        with self._lock:
+            if self._buffer is None or not self._filled: return None
+            start = (self._write_pos - self._filled) % len(self._buffer)
+            if start + self._filled <= len(self._buffer):
+                take = self._buffer[start:start + self._filled].copy()
+            else:
+                take = np.concatenate((self._buffer[start:], self._buffer[:self._write_pos]))
+            sample_rate, channels = self.sample_rate, self.channels
+            self._buffer = None
+            self._write_pos = self._filled = 0
+            self.truncated, self.dropped_frames, self.mean_square, self.peak = False, 0, 0.0, 0.0
+        take = take[:len(take) - len(take) % channels]
+        wav_buffer = io.BytesIO()
+        with wave.open(wav_buffer, 'wb') as wf:
+            wf.setnchannels(channels); wf.setsampwidth(2); wf.setframerate(sample_rate)
+            wf.writeframes(take.astype('<i2', copy=False).tobytes())
+        return wav_buffer.getvalue()
@@ -0,0 +1,217 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# --- PITCH TRACKING (YIN) ---
+# Frame-batched YIN: for a batch of frames the autocorrelation of every frame is one rfft/irfft
+# pair over a strided view, window energies come from a cumulative sum of squares, and the
+# cumulative mean normalized difference is picked for its first dip below threshold with array
+# ops only. The signal is box-filtered down to roughly PITCH_RATE_TARGET first, which is ample
+# for the violin's fundamentals (G3 to about E7) and cuts the FFT work several times over.
+
+PITCH_HOP_SECONDS = 0.01
+PITCH_FMIN, PITCH_FMAX = 180.0, 2800.0 # Open G is 196 Hz; allow for flat tuning
+PITCH_RATE_TARGET = 16000
+YIN_WINDOW_SECONDS = 0.025
+YIN_THRESHOLD = 0.15 # Absolute threshold for the first dip
+VOICING_THRESHOLD = 0.35 # Frames whose best dip is above this are treated as unpitched
+PITCH_BATCH = 1024
+SILENCE_DB = 40.0
+
+class PitchTracker:
+    def __init__(self, framerate, hop_seconds=PITCH_HOP_SECONDS):
+        self.decimation = max(1, int(framerate // PITCH_RATE_TARGET))
+        self.rate = framerate / self.decimation
+        self.hop = max(1, int(round(self.rate * hop_seconds)))
+        self.tau_min = max(2, int(self.rate / PITCH_FMAX))
+        self.tau_max = int(np.ceil(self.rate / PITCH_FMIN))
+        self.window = int(round(self.rate * YIN_WINDOW_SECONDS))
+        self.frame_length = self.window + self.tau_max + 2 # Lags up to tau_max + 1 for the local-minimum test
+        self.n_fft = 1 << int(np.ceil(np.log2(self.frame_length)))
+        self._raw_pending = np.zeros(0, dtype=np.float32)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._f0, self._aperiodicity, self._rms = [], [], []
+
+    def add(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if self.decimation > 1:
+            raw = np.concatenate((self._raw_pending, block))
+            usable = len(raw) - len(raw) % self.decimation
+            self._raw_pending = raw[usable:].copy()
+            block = raw[:usable].reshape(-1, self.decimation).mean(axis=1)
+        samples = np.concatenate((self._pending, block))
+        n_frames = (len(samples) - self.frame_length) // self.hop + 1 if len(samples) >= self.frame_length else 0
+        if n_frames:
+            frames = sliding_window_view(samples, self.frame_length)[::self.hop][:n_frames]
+            for b0 in range(0, n_frames, PITCH_BATCH):
+                self._process(frames[b0:b0 + PITCH_BATCH])
+        self._pending = samples[n_frames * self.hop:].copy()
+
+    def _process(self, frames):
+        W, n_lags = self.window, self.tau_max + 2
+        # r[t] = sum_{j<W} x[j] x[j+t]: cross-correlation of each frame with its own first W samples
+        spectrum = np.fft.rfft(frames, self.n_fft, axis=1)
+        head = np.fft.rfft(frames[:, :W], self.n_fft, axis=1)
+        r = np.fft.irfft(spectrum * np.conj(head), self.n_fft, axis=1)[:, :n_lags]
+        energy = np.cumsum(np.square(frames, dtype=np.float64), axis=1)
+        energy = np.hstack((np.zeros((len(frames), 1)), energy))
+        window_energy = energy[:, W:W + n_lags] - energy[:, :n_lags] # sum_{j=t}^{t+W-1} x[j]^2
+        d = np.maximum(window_energy[:, :1] + window_energy - 2 * r, 0.0)
+        cmnd = np.ones_like(d)
+        cmnd[:, 1:] = d[:, 1:] * np.arange(1, n_lags) / np.maximum(np.cumsum(d[:, 1:], axis=1), 1e-12)
+
+        lo, hi = self.tau_min, self.tau_max + 1
+        lags = cmnd[:, lo:hi]
+        dips = (lags < YIN_THRESHOLD) & (lags <= cmnd[:, lo - 1:hi - 1]) & (lags < cmnd[:, lo + 1:hi + 1])
+        tau = np.where(dips.any(axis=1), dips.argmax(axis=1), lags.argmin(axis=1)) + lo
+        rows = np.arange(len(frames))
+        a, b, c = cmnd[rows, tau - 1], cmnd[rows, tau], cmnd[rows, tau + 1]
+        curvature = a - 2 * b + c
+        shift = np.clip(np.where(curvature > 1e-12, 0.5 * (a - c) / np.where(curvature > 1e-12, curvature, 1.0), 0.0), -0.5, 0.5)
+        self._f0.append((self.rate / (tau + shift)).astype(np.float32))
+        self._aperiodicity.append(b.astype(np.float32))
+        self._rms.append(np.sqrt(window_energy[:, 0] / W).astype(np.float32))
+
+    def features(self):
+        if not self._f0 and len(self._pending) + len(self._raw_pending):
+            self.add(np.zeros(self.frame_length * self.decimation, dtype=np.float32)) # Shorter than one frame
+        f0 = np.concatenate(self._f0) if self._f0 else np.zeros(0, dtype=np.float32)
+        if len(f0):
+            aperiodicity, rms = np.concatenate(self._aperiodicity), np.concatenate(self._rms)
+            rms_db = 20 * np.log10(np.maximum(rms, 1e-6))
+            voiced = (aperiodicity < VOICING_THRESHOLD) & (rms_db >= rms_db.max() - SILENCE_DB) & (rms_db > -60.0)
+            f0 = np.where(voiced, f0, 0.0).astype(np.float32)
+        pitch_rate = self.rate / self.hop
+        return {"pitch_rate": pitch_rate, "pitch_f0": f0, **note_features(f0, pitch_rate)}
+
+def pitch_features(samples, framerate, block_frames=1 << 18):
+    tracker = PitchTracker(framerate)
+    for start in range(0, len(samples), block_frames):
+        tracker.add(samples[start:start + block_frames])
+    return tracker.features()
+
+
+# --- NOTES, INTONATION & VIBRATO ---
+# The f0 contour is cut into notes wherever voicing or the nearest semitone of a ~0.2 s moving
+# average (long enough to average out vibrato) changes. Per note: the nominal equal-tempered pitch,
+# the mean deviation from it in cents, and vibrato rate (zero crossings of the pitch around the note's
+# linear trend, so a slow slide or drift isn't mistaken for vibrato) and width (half the peak-to-peak
+# extent, from the RMS of the same detrended pitch). Oscillations outside VIBRATO_RATE_RANGE don't
+# count as vibrato. All per-note statistics are segment reductions (np.add.reduceat), so there is no
+# Python loop over frames or notes.
+
+NOTE_SMOOTH_SECONDS = 0.2
+VIBRATO_SMOOTH_SECONDS = 0.05 # Removes tracker jitter before counting zero crossings
+MIN_NOTE_SECONDS = 0.1
+MIN_VIBRATO_NOTE_SECONDS = 0.3
+MIN_VIBRATO_CENTS = 8.0
+VIBRATO_RATE_RANGE = (3.0, 9.0) # Hz
+IN_TUNE_CENTS = 10.0
+
+def _moving_mean(values, weights, width):
+    if width <= 1: return np.where(weights > 0, values, 0.0)
+    kernel = np.ones(width)
+    total = np.convolve(values * weights, kernel, mode="same")
+    count = np.convolve(weights, kernel, mode="same")
+    return total / np.maximum(count, 1e-9)
+
+def _detrend_segments(values, starts, lengths):
+    # Residual of each segment after removing its own least-squares line
+    t = np.arange(len(values)) - np.repeat(starts, lengths).astype(np.float64)
+    t_mean = np.repeat(np.add.reduceat(t, starts) / lengths, lengths)
+    y_mean = np.repeat(np.add.reduceat(values, starts) / lengths, lengths)
+    dt = t - t_mean
+    slope = np.add.reduceat(dt * (values - y_mean), starts) / np.maximum(np.add.reduceat(dt * dt, starts), 1e-12)
+    return values - y_mean - np.repeat(slope, lengths) * dt
+
+def f0_to_midi(f0):
+    f0 = np.asarray(f0, dtype=np.float64)
+    return np.where(f0 > 0, 69 + 12 * np.log2(np.maximum(f0, 1e-9) / 440.0), np.nan)
+
+def note_features(f0, pitch_rate):
+    empty = np.zeros(0, dtype=np.float32)
+    notes = {"note_start": empty, "note_end": empty, "note_midi": np.zeros(0, dtype=np.int16), "note_cents": empty,
+             "note_vibrato_rate": empty, "note_vibrato_cents": empty}
+    voiced = np.asarray(f0) > 0
+    if not voiced.any(): return notes
+    midi = np.nan_to_num(f0_to_midi(f0))
+    weights = voiced.astype(np.float64)
+    label = np.where(voiced, np.round(_moving_mean(midi, weights, int(round(NOTE_SMOOTH_SECONDS * pitch_rate)))), -1)
+    starts = np.flatnonzero(np.diff(label, prepend=-2) != 0)
+    lengths = np.diff(np.append(starts, len(label)))
+
+    cents = 100 * midi
+    smooth = _moving_mean(cents, weights, int(round(VIBRATO_SMOOTH_SECONDS * pitch_rate)))
+    mean = np.add.reduceat(cents, starts) / lengths
+    mean_sq = np.add.reduceat(np.square(_detrend_segments(cents, starts, lengths)), starts) / lengths
+    residual = _detrend_segments(smooth, starts, lengths)
+    sign_change = np.append(np.signbit(residual[1:]) != np.signbit(residual[:-1]), False)
+    sign_change[starts[1:] - 1] = False # Crossings between two notes don't count
+    crossings = np.add.reduceat(sign_change, starts)
+
+    keep = voiced[starts] & (lengths >= MIN_NOTE_SECONDS * pitch_rate)
+    seconds = lengths / pitch_rate
+    width = np.sqrt(2 * mean_sq) # Sinusoid: peak deviation = sqrt(2) * RMS
+    rate = crossings / (2 * seconds)
+    has_vibrato = ((width >= MIN_VIBRATO_CENTS) & (seconds >= MIN_VIBRATO_NOTE_SECONDS)
+                   & (rate >= VIBRATO_RATE_RANGE[0]) & (rate <= VIBRATO_RATE_RANGE[1]))
+    nominal = label[starts]
+    notes.update(
+        note_start=(starts / pitch_rate)[keep].astype(np.float32), note_end=((starts + lengths) / pitch_rate)[keep].astype(np.float32),
+        note_midi=nominal[keep].astype(np.int16), note_cents=(mean - 100 * nominal)[keep].astype(np.float32),
+        note_vibrato_rate=np.where(has_vibrato, rate, np.nan)[keep].astype(np.float32),
+        note_vibrato_cents=np.where(has_vibrato, width, 0.0)[keep].astype(np.float32),
+    )
+    return notes
+
+def intonation_summary(features):
+    # Duration-weighted over notes; None where the recording has no usable notes
+    cents = features["note_cents"].astype(np.float64)
+    seconds = (features["note_end"] - features["note_start"]).astype(np.float64)
+    vibrato = ~np.isnan(features["note_vibrato_rate"])
+    if not len(cents): return {"notes": 0, "mean_abs_cents": None, "bias_cents": None, "in_tune_fraction": None,
+                               "vibrato_fraction": None, "vibrato_rate": None, "vibrato_cents": None}
+    return {
+        "notes": int(len(cents)),
+        "mean_abs_cents": float(np.average(np.abs(cents), weights=seconds)),
+        "bias_cents": float(np.average(cents, weights=seconds)), # > 0: sharp of equal temperament
+        "in_tune_fraction": float(np.average(np.abs(cents) <= IN_TUNE_CENTS, weights=seconds)),
+        "vibrato_fraction": float(np.average(vibrato, weights=seconds)),
+        "vibrato_rate": float(np.median(features["note_vibrato_rate"][vibrato])) if vibrato.any() else None,
+        "vibrato_cents": float(np.median(features["note_vibrato_cents"][vibrato])) if vibrato.any() else None,
+    }
+
+
+# --- PITCH AGAINST THE BENCHMARK ---
+def _cents_along_path(benchmark_features, user_features, path_seconds):
+    # Maps every benchmark pitch frame through the alignment path onto the user's take; returns the
+    # benchmark times and user-minus-benchmark cents (NaN where either side is unpitched)
+    bench_f0, user_f0 = benchmark_features["pitch_f0"], user_features["pitch_f0"]
+    bench_times = np.arange(len(bench_f0)) / benchmark_features["pitch_rate"]
+    path_bench, first = np.unique(path_seconds[:, 0], return_index=True)
+    user_times = np.interp(bench_times, path_bench, path_seconds[first, 1])
+    user_index = np.clip(np.round(user_times * user_features["pitch_rate"]).astype(np.int64), 0, max(len(user_f0) - 1, 0))
+    user_at = user_f0[user_index] if len(user_f0) else np.zeros_like(bench_f0)
+    both = (bench_f0 > 0) & (user_at > 0)
+    cents = np.full(len(bench_f0), np.nan)
+    cents[both] = 1200 * np.log2(user_at[both] / bench_f0[both])
+    cents = (cents + 600) % 1200 - 600 # Pitch class only: an octave slip in either track isn't a tuning error
+    return bench_times, cents
+
+def compare_intonation(benchmark_features, user_features, alignment=None):
+    if "pitch_f0" not in benchmark_features or "pitch_f0" not in user_features: return None
+    result = {"user": intonation_summary(user_features), "benchmark": intonation_summary(benchmark_features),
+              "vs_benchmark_cents": None, "vs_benchmark_abs_cents": None, "section_cents": None}
+    if alignment is None or not len(benchmark_features["pitch_f0"]): return result
+    bench_times, cents = _cents_along_path(benchmark_features, user_features, alignment["path_seconds"])
+    valid = ~np.isnan(cents)
+    if not valid.any(): return result
+    section = np.searchsorted(alignment["section_end"], bench_times, side="right")
+    in_section = valid & (section < len(alignment["section_end"]))
+    result.update(
+        vs_benchmark_cents=float(np.median(cents[valid])), # > 0: the user played sharp of the benchmark
+        vs_benchmark_abs_cents=float(np.median(np.abs(cents[valid]))),
+        section_cents=np.array([np.median(cents[in_section & (section == i)]) if (in_section & (section == i)).any() else np.nan
+                                for i in range(len(alignment["section_end"]))]),
+    )
+    return result
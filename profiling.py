@@ -0,0 +1,97 @@
+import contextvars
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+# --- PER-STAGE PROFILING ---
+# Pipeline code wraps each stage in `with stage("name", samples=n):`. Outside a `Profiler.activate()`
+# block that is a no-op costing one context-variable lookup, so instrumentation can stay in the hot
+# path. The active profiler is held in a context variable, which keeps concurrent Streamlit sessions
+# (one thread each) from mixing their timings. Peak memory is measured with tracemalloc (NumPy
+# reports its allocations to it) and only when the profiler was created with trace_memory. tracemalloc
+# is process-wide, so only one profiler may trace at a time: the others record timings only, and
+# the peaks the tracing one reports also include whatever other threads allocated meanwhile.
+
+_active = contextvars.ContextVar("violin_studio_profiler", default=None)
+_tracing_lock = threading.Lock()
+
+class Profiler:
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []
+        self._tracing = False
+
+    @contextmanager
+    def activate(self):
+        self._tracing = self.trace_memory and _tracing_lock.acquire(blocking=False)
+        started_tracing = self._tracing and not tracemalloc.is_tracing()
+        if started_tracing: tracemalloc.start()
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+            if started_tracing: tracemalloc.stop()
+            if self._tracing:
+                self._tracing = False
+                _tracing_lock.release()
+
+    @contextmanager
+    def stage(self, name, samples=None):
+        tracing = self._tracing
+        frame = {"name": name, "start_bytes": 0, "peak_bytes": 0}
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack: self._stack[-1]["peak_bytes"] = max(self._stack[-1]["peak_bytes"], peak)
+            tracemalloc.reset_peak()
+            frame["start_bytes"] = frame["peak_bytes"] = current
+        path = "/".join([parent["name"] for parent in self._stack] + [name])
+        self._stack.append(frame)
+        start = time.perf_counter()
+        record = {"stage": path, "samples": samples}
+        try:
+            yield record # Callers may fill in "samples" once they know it
+        finally:
+            wall = time.perf_counter() - start
+            self._stack.pop()
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                frame["peak_bytes"] = max(frame["peak_bytes"], peak)
+                record["peak_memory_bytes"] = frame["peak_bytes"] - frame["start_bytes"]
+                if self._stack: self._stack[-1]["peak_bytes"] = max(self._stack[-1]["peak_bytes"], frame["peak_bytes"])
+            record["wall_s"] = wall
+            if record["samples"]: record["samples_per_s"] = record["samples"] / wall if wall > 0 else None
+            self.records.append(record)
+
+    def summary(self):
+        # Totals per stage path, in first-seen order
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record["stage"], {"stage": record["stage"], "calls": 0, "wall_s": 0.0, "samples": 0, "peak_memory_bytes": None})
+            total["calls"] += 1; total["wall_s"] += record["wall_s"]; total["samples"] += record["samples"] or 0
+            if "peak_memory_bytes" in record: total["peak_memory_bytes"] = max(total["peak_memory_bytes"] or 0, record["peak_memory_bytes"])
+        for total in totals.values():
+            total["samples_per_s"] = total["samples"] / total["wall_s"] if total["samples"] and total["wall_s"] > 0 else None
+        return list(totals.values())
+
+    def export(self, **extra):
+        return {**extra, "stages": self.summary(), "records": self.records}
+
+    def to_json(self, **extra):
+        return json.dumps(self.export(**extra), indent=2, default=float)
+
+def active_profiler():
+    return _active.get()
+
+@contextmanager
+def stage(name, samples=None):
+    profiler = _active.get()
+    if profiler is None:
+        yield {"stage": name, "samples": samples}
+        return
+    with profiler.stage(name, samples) as record:
+        yield record
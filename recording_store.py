@@ -0,0 +1,125 @@
+import mmap
+import os
+import threading
+import time
+import uuid
+import weakref
+
+from feature_cache import content_digest
+
+
+# --- CONTENT-ADDRESSED RECORDING STORE ---
+# Uploaded and recorded audio is written once to local disk under its SHA-256, so the same file
+# uploaded twice (or by two sessions) is stored once. Sessions keep only digests plus metadata
+# and declare which digests they reference; a blob is deleted when no live session references it.
+# Sessions that go away are released when their SessionHandle is garbage collected, or after
+# SESSION_TTL_SECONDS without activity. Reads are memory-mapped rather than copied into RAM.
+
+SESSION_TTL_SECONDS = 6 * 3600
+
+class RecordingStore:
+    def __init__(self, root, session_ttl=SESSION_TTL_SECONDS):
+        self.root = root
+        self.session_ttl = session_ttl
+        self._lock = threading.Lock()
+        self._owners = {} # owner -> set of digests
+        self._last_seen = {} # owner -> monotonic time of last activity
+        self._refcounts = {} # digest -> number of owners referencing it
+        os.makedirs(root, exist_ok=True)
+        self._sweep_orphans()
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data, owner=None):
+        # Referencing before writing means a concurrent release can never delete the blob under us
+        digest = content_digest(data)
+        if owner is not None:
+            with self._lock:
+                digests = self._owners.setdefault(owner, set())
+                if digest not in digests:
+                    digests.add(digest)
+                    self._refcounts[digest] = self._refcounts.get(digest, 0) + 1
+                self._last_seen[owner] = time.monotonic()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        else:
+            os.utime(path) # Keeps re-uploaded blobs from looking orphaned to the startup sweep
+        return digest
+
+    def open(self, digest):
+        # Read-only memory map of the blob; supports len(), slicing and the buffer protocol
+        with open(self.path(digest), "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def size(self, digest):
+        return os.path.getsize(self.path(digest))
+
+    # --- REFERENCE COUNTING ---
+    def set_references(self, owner, digests):
+        digests = {digest for digest in digests if digest}
+        with self._lock:
+            previous = self._owners.get(owner, set())
+            self._owners[owner] = digests
+            self._last_seen[owner] = time.monotonic()
+            for digest in digests - previous:
+                self._refcounts[digest] = self._refcounts.get(digest, 0) + 1
+            released = self._decrement(previous - digests)
+            released += self._expire_idle_owners()
+        self._delete(released)
+
+    def release_owner(self, owner):
+        with self._lock:
+            self._last_seen.pop(owner, None)
+            released = self._decrement(self._owners.pop(owner, set()))
+        self._delete(released)
+
+    def _decrement(self, digests):
+        released = []
+        for digest in digests:
+            self._refcounts[digest] -= 1
+            if self._refcounts[digest] <= 0:
+                del self._refcounts[digest]
+                released.append(digest)
+        return released
+
+    def _expire_idle_owners(self):
+        cutoff = time.monotonic() - self.session_ttl
+        released = []
+        for owner in [owner for owner, seen in self._last_seen.items() if seen < cutoff]:
+            del self._last_seen[owner]
+            released += self._decrement(self._owners.pop(owner, set()))
+        return released
+
+    def _delete(self, digests):
+        for digest in digests:
+            with self._lock:
+                if digest in self._refcounts: continue # Re-referenced in the meantime
+                try:
+                    os.remove(self.path(digest))
+                except OSError:
+                    pass
+
+    def _sweep_orphans(self):
+        # Blobs left by a previous process have no live owners; drop those idle for longer than the TTL
+        cutoff = time.time() - self.session_ttl
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    if os.path.getmtime(path) < cutoff: os.remove(path)
+                except OSError:
+                    pass
+
+
+class SessionHandle:
+    # Lives in a session's state; when the session is discarded the handle is collected and the
+    # session's references are released
+    def __init__(self, store):
+        self.id = uuid.uuid4().hex
+        self._finalizer = weakref.finalize(self, store.release_owner, self.id)
@@ -0,0 +1,142 @@
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import islice
+
+
+# --- INDEXED, RANKED REPERTOIRE SEARCH ---
+# Built once from the piece database: an inverted index from accent-folded tokens to the pieces
+# (and fields) they occur in, a sorted vocabulary for prefix lookups, and a single-deletion
+# neighbourhood index for typo-tolerant matching. Postings are kept in impact order so a query
+# scores candidates from its most selective term in batches, stopping as soon as enough pieces match
+# every term, which keeps latency flat as the catalog grows; very common terms are ranked
+# approximately. Results are ordered by terms matched, then match tier (exact > prefix > typo),
+# then relevance.
+
+FIELD_WEIGHTS = {"title": 3.0, "composer": 2.5, "keywords": 2.0}
+EXACT, PREFIX, FUZZY = 1.0, 0.7, 0.5
+TIERS = {EXACT: 2, PREFIX: 1, FUZZY: 0}
+MIN_PREFIX_LENGTH = 2
+MIN_FUZZY_LENGTH = 4
+MAX_EXPANSIONS = 64 # Vocabulary tokens considered per query term
+CANDIDATE_LIMIT = 1000 # Postings read per batch when seeding candidates
+_LIGATURES = str.maketrans({"œ": "oe", "Œ": "oe", "æ": "ae", "Æ": "ae", "ß": "ss", "ø": "o", "Ø": "o", "ł": "l", "Ł": "l"})
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def fold(text):
+    text = unicodedata.normalize("NFKD", text.translate(_LIGATURES))
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+def tokenize(text):
+    return _TOKEN_RE.findall(fold(text))
+
+def _deletes(token):
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+def _within_one_edit(a, b):
+    # Optimal string alignment distance <= 1 (insert, delete, substitute or swap neighbours)
+    if a == b: return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1: return False
+    if la == lb:
+        diffs = [i for i in range(la) if a[i] != b[i]]
+        return len(diffs) == 1 or (len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]])
+    if la > lb: a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]: i += 1
+    return a[i:] == b[i + 1:]
+
+
+class RepertoireIndex:
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self._keys = list(pieces)
+        self._postings = defaultdict(dict) # token -> {doc: best field weight}
+        for doc, key in enumerate(self._keys):
+            piece = pieces[key]
+            fields = {"title": piece.get("title", ""), "composer": piece.get("composer", ""), "keywords": " ".join(piece.get("keywords", []))}
+            for field, text in fields.items():
+                for token in tokenize(text):
+                    postings = self._postings[token]
+                    postings[doc] = max(postings.get(doc, 0.0), FIELD_WEIGHTS[field])
+        self._vocabulary = sorted(self._postings)
+        self._impacts = {token: sorted(postings, key=lambda doc: (-postings[doc], doc)) for token, postings in self._postings.items()}
+        self._idf = {token: math.log(1.0 + len(self._keys) / len(postings)) for token, postings in self._postings.items()}
+        self._neighbours = defaultdict(set)
+        for token in self._vocabulary:
+            if len(token) < MIN_FUZZY_LENGTH - 1: continue
+            for variant in _deletes(token) | {token}:
+                self._neighbours[variant].add(token)
+
+    def _expand(self, term):
+        # Vocabulary tokens matching one query term, mapped to (match tier, match quality x idf)
+        matches = {}
+        if len(term) >= MIN_PREFIX_LENGTH:
+            i = bisect_left(self._vocabulary, term)
+            while i < len(self._vocabulary) and self._vocabulary[i].startswith(term) and len(matches) < MAX_EXPANSIONS:
+                matches[self._vocabulary[i]] = PREFIX; i += 1
+        if len(term) >= MIN_FUZZY_LENGTH:
+            for variant in _deletes(term) | {term}:
+                for token in self._neighbours.get(variant, ()):
+                    if token not in matches and _within_one_edit(term, token): matches[token] = FUZZY
+        if term in self._postings: matches[term] = EXACT
+        return {token: (TIERS[quality], quality * self._idf[token]) for token, quality in matches.items()}
+
+    def _impact_order(self, expansion):
+        # (doc, (tier, score)) for one term: its tokens best tier first, each token's postings in impact order
+        for token, (tier, weight) in sorted(expansion.items(), key=lambda item: (-item[1][0], -item[1][1])):
+            postings = self._postings[token]
+            for doc in self._impacts[token]:
+                yield doc, (tier, weight * postings[doc])
+
+    def _seed(self, expansion, budget=CANDIDATE_LIMIT):
+        # Best match per doc among the first `budget` postings of one term
+        matches = {}
+        for doc, match in islice(self._impact_order(expansion), budget):
+            if match > matches.get(doc, (-1, 0.0)): matches[doc] = match
+        return matches
+
+    def _score(self, expansion, doc):
+        return max(((tier, weight * self._postings[token][doc]) for token, (tier, weight) in expansion.items() if doc in self._postings[token]), default=None)
+
+    def _full_matches(self, expansions, limit):
+        # Seeds from the most selective term and checks the others by lookup only, reading further down
+        # its impact-ordered postings until `limit` pieces match every term or the postings run out
+        seed, others = expansions[0], expansions[1:]
+        best, matches = {}, {}
+        postings = self._impact_order(seed)
+        while True:
+            batch = list(islice(postings, CANDIDATE_LIMIT))
+            for doc, match in batch:
+                if match <= best.get(doc, (-1, 0.0)): continue
+                best[doc] = match
+                tiers, score = match
+                for expansion in others:
+                    extra = self._score(expansion, doc)
+                    if extra is None: break
+                    tiers, score = tiers + extra[0], score + extra[1]
+                else:
+                    matches[doc] = (tiers, score)
+            if len(batch) < CANDIDATE_LIMIT or len(matches) >= limit: return matches
+
+    def search(self, query, limit=10):
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms: return []
+        expansions = [self._expand(term) for term in terms]
+        matches, matched_terms = {}, {}
+        if all(expansions):
+            expansions.sort(key=lambda expansion: sum(len(self._postings[token]) for token in expansion))
+            matches = self._full_matches(expansions, limit)
+            matched_terms = dict.fromkeys(matches, len(terms))
+        if not matches:
+            # No piece matches every term: rank pieces by how many terms they match, then tier and relevance
+            for expansion in expansions:
+                for doc, (tier, score) in self._seed(expansion).items():
+                    tiers, total = matches.get(doc, (0, 0.0))
+                    matches[doc] = (tiers + tier, total + score); matched_terms[doc] = matched_terms.get(doc, 0) + 1
+        # Exact hits outrank prefix hits, which outrank one-edit typos, before relevance is compared
+        ranked = heapq.nlargest(limit, matches, key=lambda doc: (matched_terms[doc], *matches[doc], -doc))
+        return [(self._keys[doc], matches[doc][1], matched_terms[doc] == len(terms)) for doc in ranked]
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from alignment import _banded_dtw, _project_window, align_performances, fast_dtw, sakoe_chiba_dtw
+
+
+def full_dtw_cost(X, Y):
+    cost = np.sqrt(((X[:, None, :] - Y[None, :, :]) ** 2).sum(axis=2))
+    D = np.full((len(X) + 1, len(Y) + 1), np.inf)
+    D[0, 0] = 0.0
+    for i in range(1, len(X) + 1):
+        for j in range(1, len(Y) + 1):
+            D[i, j] = cost[i - 1, j - 1] + min(D[i - 1, j - 1], D[i - 1, j], D[i, j - 1])
+    return D[-1, -1]
+
+def path_cost(X, Y, path):
+    return np.sqrt(((X[path[:, 0]] - Y[path[:, 1]]) ** 2).sum(axis=1)).sum()
+
+def assert_valid_path(path, n, m):
+    assert tuple(path[0]) == (0, 0) and tuple(path[-1]) == (n - 1, m - 1)
+    steps = np.diff(path, axis=0)
+    assert ((steps >= 0) & (steps <= 1)).all() and (steps.sum(axis=1) >= 1).all()
+
+@pytest.mark.parametrize("seed", range(5))
+def test_unbanded_matches_full_matrix(seed):
+    rng = np.random.default_rng(seed)
+    X, Y = rng.normal(size=(int(rng.integers(5, 40)), 3)), rng.normal(size=(int(rng.integers(5, 40)), 3))
+    n, m = len(X), len(Y)
+    path = _banded_dtw(X, Y, np.zeros(n, dtype=np.int64), np.full(n, m, dtype=np.int64))
+    assert_valid_path(path, n, m)
+    assert path_cost(X, Y, path) == pytest.approx(full_dtw_cost(X, Y))
+
+@pytest.mark.parametrize("seed", range(5))
+def test_wide_band_matches_full_matrix(seed):
+    # A band covering the whole matrix must give the optimal path; narrower bands never beat it
+    rng = np.random.default_rng(seed)
+    X, Y = rng.normal(size=(60, 4)), rng.normal(size=(45, 4))
+    assert path_cost(X, Y, sakoe_chiba_dtw(X, Y, radius=60)) == pytest.approx(full_dtw_cost(X, Y))
+    narrow = sakoe_chiba_dtw(X, Y, radius=3)
+    assert_valid_path(narrow, 60, 45)
+    assert path_cost(X, Y, narrow) >= full_dtw_cost(X, Y) - 1e-9
+
+def test_fast_dtw_is_near_optimal():
+    rng = np.random.default_rng(0)
+    X = np.cumsum(rng.normal(size=(300, 2)), axis=0)
+    Y = X[np.sort(rng.integers(0, 300, size=260))] + 0.1 * rng.normal(size=(260, 2))
+    path = fast_dtw(X, Y, radius=4)
+    assert_valid_path(path, 300, 260)
+    assert path_cost(X, Y, path) <= 1.05 * full_dtw_cost(X, Y)
+
+def test_project_window_covers_projected_path():
+    path = np.array([(0, 0), (1, 1), (1, 2), (2, 3), (3, 3)])
+    lo, hi = _project_window(path, 8, 8, radius=1)
+    assert lo[0] == 0 and hi[-1] == 8
+    assert (np.diff(lo) >= 0).all() and (np.diff(hi) >= 0).all() and (lo[1:] < hi[:-1]).all()
+    for i, j in path:
+        for row in (2 * i, 2 * i + 1):
+            assert lo[row] <= 2 * j and 2 * j + 1 < hi[row]
+
+
+def synthetic_features(rng, n_frames, frame_rate=20.0):
+    note_starts = np.cumsum(rng.integers(5, 16, size=n_frames))
+    note_starts = np.concatenate(([0], note_starts[note_starts < n_frames]))
+    note = np.repeat(np.arange(len(note_starts)), np.diff(np.append(note_starts, n_frames)))
+    pitch_class = rng.integers(0, 12, size=len(note_starts))
+    chroma = np.full((n_frames, 12), 0.05, dtype=np.float32)
+    chroma[np.arange(n_frames), pitch_class[note]] = 1.0
+    rms = (0.1 * rng.uniform(0.5, 1.0, size=len(note_starts))[note]).astype(np.float32)
+    onset = np.full(n_frames, 0.1, dtype=np.float32)
+    onset[note_starts] = 5.0
+    return {"frame_rate": frame_rate, "frame_rms": rms, "frame_onset": onset, "frame_chroma": chroma}
+
+def warp(features, ratio, lead_in_seconds, gain):
+    # Plays the benchmark `ratio` times as fast, after `lead_in_seconds` of silence and `gain` louder
+    n = len(features["frame_rms"])
+    source = np.minimum((np.arange(int(n / ratio)) * ratio).astype(np.int64), n - 1)
+    lead = int(lead_in_seconds * features["frame_rate"])
+    silent = {"frame_rms": np.full(lead, 1e-5), "frame_onset": np.zeros(lead), "frame_chroma": np.zeros((lead, 12))}
+    warped = {"frame_rate": features["frame_rate"]}
+    for name in silent:
+        values = features[name][source] * (gain if name == "frame_rms" else 1)
+        warped[name] = np.concatenate((silent[name], values)).astype(np.float32)
+    return warped
+
+def test_align_performances_recovers_tempo_dynamics_and_offset():
+    benchmark = synthetic_features(np.random.default_rng(1), 2400) # 2 minutes
+    user = warp(benchmark, ratio=0.8, lead_in_seconds=4.5, gain=2.0)
+    alignment = align_performances(benchmark, user)
+    assert np.median(alignment["tempo_ratio"]) == pytest.approx(0.8, abs=0.03)
+    assert np.median(alignment["dynamics_db"]) == pytest.approx(20 * np.log10(2.0), abs=0.5)
+    assert alignment["start_offset"] == pytest.approx(4.5, abs=0.1)
@@ -0,0 +1,24 @@
+import numpy as np
+
+from analysis import get_human_comparative_analysis
+
+
+def features(duration, avg_amplitude):
+    return {"duration": duration, "avg_amplitude": avg_amplitude, "peak_amplitude": 0.9}
+
+def aligned(tempo_ratio, dynamics_db):
+    return {"tempo_ratio": tempo_ratio, "dynamics_db": dynamics_db, "intonation": None, "alignment": {
+        "section_start": np.array([0.0]), "section_end": np.array([80.0]), "tempo_ratio": np.array([tempo_ratio]),
+        "dynamics_db": np.array([dynamics_db]), "start_offset": 0.0}}
+
+def test_tempo_and_dynamics_are_explained_by_the_aligned_medians():
+    # A long pause makes the take longer overall even though the playing itself was faster
+    text = get_human_comparative_analysis(features(80.0, 0.2), features(95.0, 0.1), aligned(1.2, 3.0))
+    assert "significantly faster" in text and "120% of the benchmark's" in text and "also counts pauses" in text
+    assert "generally louder" in text and "3.0 dB louder" in text and "average loudness" not in text
+
+def test_unaligned_fallback_uses_totals():
+    comparison = {"tempo_ratio": 80.0 / 95.0, "dynamics_db": -6.0, "intonation": None, "alignment": None}
+    text = get_human_comparative_analysis(features(80.0, 0.2), features(95.0, 0.1), comparison)
+    assert "significantly slower" in text and "95.0 seconds compared to the benchmark's 80.0 seconds" in text
+    assert "average loudness of your recording (0.10)" in text
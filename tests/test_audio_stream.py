@@ -0,0 +1,30 @@
+import io
+import struct
+
+import numpy as np
+import pytest
+
+from audio_stream import _pcm_wav_view, read_wav_header, stream_audio_features
+
+PCM_GUID_TAIL = b"\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71" # KSDATAFORMAT_SUBTYPE_* after the tag
+
+def extensible_wav(samples, subformat, bits, framerate=8000):
+    data = samples.tobytes()
+    block_align = bits // 8
+    fmt = struct.pack("<HHIIHHHHI", 0xFFFE, 1, framerate, framerate * block_align, block_align, bits, 22, bits, 0x4)
+    fmt += struct.pack("<H", subformat) + PCM_GUID_TAIL
+    return (b"RIFF" + struct.pack("<I", 4 + 8 + len(fmt) + 8 + len(data)) + b"WAVE"
+            + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data)
+
+def test_extensible_subformat_is_resolved():
+    tone = 0.5 * np.sin(2 * np.pi * 440 * np.arange(8000) / 8000)
+    float_wav = extensible_wav(tone.astype("<f4"), subformat=3, bits=32)
+    assert read_wav_header(io.BytesIO(float_wav))[0] == 3
+    assert _pcm_wav_view(float_wav) is None # Float samples must not be read as <i4 PCM
+
+def test_extensible_pcm_streams_in_place():
+    tone = 0.5 * np.sin(2 * np.pi * 440 * np.arange(8000) / 8000)
+    pcm_wav = extensible_wav((tone * 32767).astype("<i2"), subformat=1, bits=16)
+    features = stream_audio_features(pcm_wav)
+    assert features["peak_amplitude"] == pytest.approx(0.5, abs=0.01)
+    assert features["avg_amplitude"] == pytest.approx(0.5 * 2 / np.pi, abs=0.01)
@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+import pytest
+
+from feature_cache import FeatureCache, feature_key
+
+
+@pytest.mark.parametrize("content", [b"", b"not a zip file", b"PK\x03\x04truncated"])
+def test_corrupt_disk_entry_is_recomputed(tmp_path, content):
+    cache = FeatureCache(disk_dir=str(tmp_path))
+    key = feature_key(b"audio", version=1)
+    (tmp_path / f"{key}.npz").write_bytes(content)
+    features = cache.get_or_compute(key, lambda: {"duration": 1.5, "frame_rms": np.ones(3, dtype=np.float32)})
+    assert features["duration"] == 1.5
+    reloaded = FeatureCache(disk_dir=str(tmp_path)).get(key)
+    assert reloaded["duration"] == 1.5 and np.array_equal(reloaded["frame_rms"], np.ones(3))
+
+def test_store_leaves_no_temporary_files(tmp_path):
+    cache = FeatureCache(disk_dir=str(tmp_path))
+    cache.put(feature_key(b"audio", version=1), {"duration": 2.0})
+    assert [name for name in os.listdir(tmp_path) if not name.endswith(".npz")] == []
+
+def test_two_threshold_sized_waveforms_stay_in_memory(tmp_path):
+    # Mirrors the app: 256 MB memory tier, two non-streamed recordings just under the streaming threshold
+    from analysis import STREAMING_THRESHOLD_BYTES
+    cache = FeatureCache(max_entries=8, max_memory_bytes=256 * 1024**2, disk_dir=str(tmp_path))
+    n_samples = STREAMING_THRESHOLD_BYTES // 2 # 16-bit mono
+    keys = [feature_key(name, version=1) for name in (b"benchmark", b"user")]
+    for key in keys:
+        cache.put(key, {"waveform": np.zeros(n_samples, dtype=np.float32), "duration": 1.0})
+    for _ in range(3): # Reruns
+        for key in keys: cache.get(key)
+    assert cache.disk_hits == 0 and cache.hits == 6
@@ -0,0 +1,31 @@
+import io
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+
+from live_capture import RingBufferRecorder
+
+
+def frame(samples, sample_rate=8000):
+    samples = np.asarray(samples, dtype=np.int16).reshape(1, -1) # Packed mono, as av delivers s16
+    return SimpleNamespace(to_ndarray=lambda: samples, sample_rate=sample_rate,
+                           layout=SimpleNamespace(channels=[0]), format=SimpleNamespace(is_planar=False))
+
+def test_level_is_smoothed_and_peak_is_held():
+    recorder = RingBufferRecorder(max_seconds=1)
+    recorder.audio_frame_callback(frame(np.full(160, 16000)))
+    loud = recorder.level_percent()
+    recorder.audio_frame_callback(frame(np.zeros(160)))
+    assert 0 < recorder.level_percent() < loud # Decays instead of dropping to the last frame's silence
+    assert recorder.peak_percent() > recorder.level_percent()
+
+def test_take_keeps_the_most_recent_audio_once_full():
+    recorder = RingBufferRecorder(max_seconds=1)
+    for i in range(12):
+        recorder.audio_frame_callback(frame(np.full(800, i)))
+    assert recorder.truncated and recorder.recorded_seconds == 1.0
+    with wave.open(io.BytesIO(recorder.take_wav_bytes())) as wf:
+        take = np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2")
+    assert len(take) == 8000 and take[0] == 2 and take[-1] == 11
+    assert not recorder.has_audio()
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from pitch import intonation_summary, pitch_features
+
+RATE = 22050
+
+def tone(f0_hz, seconds, vibrato_hz=0.0, vibrato_cents=0.0, drift_cents=0.0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    cents = drift_cents * t / seconds + vibrato_cents * np.sin(2 * np.pi * vibrato_hz * t)
+    phase = 2 * np.pi * np.cumsum(f0_hz * 2 ** (cents / 1200)) / RATE
+    return (0.3 * sum(np.sin(k * phase) / k for k in range(1, 6))).astype(np.float32)
+
+def test_steady_note_pitch_and_tuning():
+    features = pitch_features(tone(440.0 * 2 ** (12 / 1200), 2.0), RATE) # A4, 12 cents sharp
+    assert list(features["note_midi"]) == [69]
+    assert features["note_cents"][0] == pytest.approx(12, abs=2)
+    assert np.isnan(features["note_vibrato_rate"][0])
+
+def test_vibrato_rate_and_width():
+    features = pitch_features(tone(392.0, 3.0, vibrato_hz=5.5, vibrato_cents=25), RATE)
+    assert len(features["note_midi"]) == 1
+    assert features["note_vibrato_rate"][0] == pytest.approx(5.5, abs=0.5)
+    assert features["note_vibrato_cents"][0] == pytest.approx(25, abs=4)
+
+@pytest.mark.parametrize("shape", [{"drift_cents": 30}, {"vibrato_hz": 0.25, "vibrato_cents": 15}])
+def test_slow_pitch_movement_is_not_vibrato(shape):
+    features = pitch_features(tone(440.0, 4.0, **shape), RATE)
+    assert np.isnan(features["note_vibrato_rate"]).all()
+    assert intonation_summary(features)["vibrato_fraction"] == 0.0
+
+def test_silence_has_no_notes():
+    features = pitch_features(np.zeros(RATE, dtype=np.float32), RATE)
+    assert not (features["pitch_f0"] > 0).any() and intonation_summary(features)["notes"] == 0
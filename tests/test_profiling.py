@@ -0,0 +1,39 @@
+import threading
+import tracemalloc
+
+import numpy as np
+
+from profiling import Profiler, stage
+
+
+def test_stage_is_a_no_op_without_profiler():
+    with stage("idle", samples=10) as record:
+        pass
+    assert record == {"stage": "idle", "samples": 10}
+
+def test_nested_stages_record_paths_and_peaks():
+    profiler = Profiler(trace_memory=True)
+    with profiler.activate():
+        with stage("outer"):
+            with stage("inner", samples=1000):
+                np.ones(1 << 20)
+    assert not tracemalloc.is_tracing()
+    summary = {row["stage"]: row for row in profiler.summary()}
+    assert summary["outer/inner"]["peak_memory_bytes"] >= 8 << 20
+    assert summary["outer"]["peak_memory_bytes"] >= summary["outer/inner"]["peak_memory_bytes"]
+
+def test_only_one_profiler_traces_memory_at_a_time():
+    first, second = Profiler(trace_memory=True), Profiler(trace_memory=True)
+    inside, release = threading.Event(), threading.Event()
+
+    def hold():
+        with first.activate(), stage("held"):
+            inside.set(); release.wait()
+    thread = threading.Thread(target=hold)
+    thread.start(); inside.wait()
+    with second.activate(), stage("concurrent"):
+        pass
+    release.set(); thread.join()
+    assert "peak_memory_bytes" in first.records[0]
+    assert "peak_memory_bytes" not in second.records[0] and second.records[0]["wall_s"] >= 0
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,61 @@
+import gc
+import os
+import threading
+import time
+
+from recording_store import RecordingStore, SessionHandle
+
+
+def test_blob_shared_by_two_owners_survives_until_both_release(tmp_path):
+    store = RecordingStore(str(tmp_path))
+    digest = store.put(b"take", owner="a")
+    assert store.put(b"take", owner="b") == digest
+    assert len([name for _, _, names in os.walk(tmp_path) for name in names]) == 1 # Stored once
+    store.release_owner("a")
+    assert bytes(store.open(digest)) == b"take"
+    store.set_references("b", [])
+    assert not os.path.exists(store.path(digest))
+
+def test_session_handle_releases_on_garbage_collection(tmp_path):
+    store = RecordingStore(str(tmp_path))
+    handle = SessionHandle(store)
+    digest = store.put(b"take", owner=handle.id)
+    del handle; gc.collect()
+    assert not os.path.exists(store.path(digest))
+
+def test_idle_owners_expire_after_ttl(tmp_path):
+    store = RecordingStore(str(tmp_path), session_ttl=0.05)
+    idle = store.put(b"idle", owner="idle")
+    active = store.put(b"active", owner="active")
+    time.sleep(0.1)
+    store.set_references("active", [active]) # Any activity sweeps owners idle past the TTL
+    assert not os.path.exists(store.path(idle)) and os.path.exists(store.path(active))
+
+def test_put_racing_a_release_keeps_the_file(tmp_path):
+    store = RecordingStore(str(tmp_path))
+    digest = store.put(b"take", owner="a")
+    delete = store._delete
+    def put_before_delete(digests):
+        store.put(b"take", owner="b") # Lands after A's last reference is dropped, before the unlink
+        delete(digests)
+    store._delete = put_before_delete
+    store.release_owner("a")
+    assert bytes(store.open(digest)) == b"take"
+
+def test_concurrent_put_and_release_never_lose_a_referenced_blob(tmp_path):
+    store = RecordingStore(str(tmp_path))
+    for i in range(200):
+        digest = store.put(b"take", owner="a")
+        holder = threading.Thread(target=store.put, args=(b"take", f"b{i}"))
+        holder.start(); store.release_owner("a"); holder.join()
+        assert os.path.exists(store.path(digest)) # Still referenced by b
+        store.release_owner(f"b{i}")
+        assert not os.path.exists(store.path(digest))
+
+def test_startup_sweep_removes_only_stale_orphans(tmp_path):
+    store = RecordingStore(str(tmp_path), session_ttl=3600)
+    stale, fresh = store.put(b"stale"), store.put(b"fresh")
+    old = time.time() - 7200
+    os.utime(store.path(stale), (old, old))
+    RecordingStore(str(tmp_path), session_ttl=3600)
+    assert not os.path.exists(store.path(stale)) and os.path.exists(store.path(fresh))
@@ -0,0 +1,50 @@
+import pytest
+
+from benchmarks.search_benchmark import synthetic_catalog
+from repertoire_search import RepertoireIndex, fold
+
+PIECES = {
+    "saint_saens": {"title": "Introduction and Rondo Capriccioso", "composer": "Camille Saint-Saëns", "keywords": ["rondo"]},
+    "part": {"title": "Spiegel im Spiegel", "composer": "Arvo Pärt", "keywords": ["minimalism"]},
+    "bach_partita": {"title": "Partita No. 2 in D minor: Chaconne", "composer": "Johann Sebastian Bach", "keywords": ["chaconne"]},
+    "spring": {"title": "The Four Seasons: Spring, Allegro", "composer": "Antonio Vivaldi", "keywords": ["vivaldi", "seasons"]},
+    "winter": {"title": "The Four Seasons: Winter, Largo", "composer": "Antonio Vivaldi", "keywords": ["vivaldi", "seasons"]},
+    "barber": {"title": "Adagio for Strings", "composer": "Samuel Barber", "keywords": ["adagio"]},
+    "tchaikovsky": {"title": "Violin Concerto in D Major", "composer": "Pyotr Ilyich Tchaikovsky", "keywords": ["concerto"]},
+}
+
+@pytest.fixture(scope="module")
+def index():
+    return RepertoireIndex(PIECES)
+
+def keys(results):
+    return [key for key, _, _ in results]
+
+def test_fold_strips_accents_and_ligatures():
+    assert fold("Saint-Saëns Pärt Œuvre") == "saint-saens part oeuvre"
+
+@pytest.mark.parametrize("query, expected", [("saint saens", "saint_saens"), ("part", "part"), ("PÄRT spiegel", "part")])
+def test_accent_folding(index, query, expected):
+    assert keys(index.search(query))[0] == expected
+
+def test_prefix_match(index):
+    assert keys(index.search("tchaik")) == ["tchaikovsky"]
+
+@pytest.mark.parametrize("typo", ["tchaikovksy", "vivladi", "chacone"])
+def test_one_edit_typos(index, typo):
+    assert index.search(typo), typo
+
+def test_exact_outranks_prefix_and_typo(index):
+    assert keys(index.search("part"))[0] == "part" # Exact beats the prefix hit on "partita"
+    assert set(keys(index.search("four"))[:2]) == {"spring", "winter"} # Exact beats the typo hit on "for"
+
+def test_all_terms_ranked_before_partial_fallback(index):
+    assert keys(index.search("vivaldi winter")) == ["winter"]
+    results = index.search("vivaldi brahms")
+    assert set(keys(results)) == {"spring", "winter"} and not any(matched_all for _, _, matched_all in results)
+
+def test_full_matches_not_lost_to_candidate_cap():
+    catalog = synthetic_catalog(50000)
+    index = RepertoireIndex(catalog)
+    results = index.search("brahms finale op 3", limit=10)
+    assert len(results) == 10 and all(matched_all for _, _, matched_all in results)
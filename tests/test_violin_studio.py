@@ -0,0 +1,54 @@
+import json
+import os
+import wave
+
+import numpy as np
+import pytest
+
+from violin_studio import main, read_manifest, takes_in_directory
+
+RATE = 8000
+
+def write_tone(path, f0, seconds=3.0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(RATE)
+        wf.writeframes((0.4 * np.sin(2 * np.pi * f0 * t) * 32767).astype("<i2").tobytes())
+    return str(path)
+
+@pytest.mark.parametrize("name, content", [
+    ("pairs.csv", "benchmark,user\ngoal.wav,takes/one.wav\n# comment\ngoal.wav,/abs/two.wav\n"),
+    ("pairs.csv", "goal.wav,takes/one.wav\ngoal.wav,/abs/two.wav\n"),
+    ("pairs.jsonl", '{"benchmark": "goal.wav", "user": "takes/one.wav"}\n\n{"benchmark": "goal.wav", "user": "/abs/two.wav"}\n'),
+])
+def test_read_manifest_resolves_against_manifest(tmp_path, name, content):
+    manifest = tmp_path / "lists" / name
+    manifest.parent.mkdir()
+    manifest.write_text(content, encoding="utf-8")
+    goal = str(tmp_path / "lists" / "goal.wav")
+    assert read_manifest(manifest) == [(goal, str(tmp_path / "lists" / "takes" / "one.wav")), (goal, "/abs/two.wav")]
+
+def test_takes_in_directory_excludes_benchmark_and_returns_absolute_paths(tmp_path, monkeypatch):
+    for name in ("goal.wav", "b.mp3", "a.wav", "notes.txt"): (tmp_path / name).write_bytes(b"")
+    monkeypatch.chdir(tmp_path)
+    pairs = takes_in_directory("goal.wav", ".")
+    assert pairs == [(str(tmp_path / "goal.wav"), str(tmp_path / "a.wav")), (str(tmp_path / "goal.wav"), str(tmp_path / "b.mp3"))]
+
+def test_batch_writes_one_record_per_take_and_reports_failures(tmp_path):
+    takes = tmp_path / "takes"
+    takes.mkdir()
+    goal = write_tone(takes / "goal.wav", 440.0)
+    write_tone(takes / "good.wav", 440.0 * 2 ** (20 / 1200))
+    (takes / "broken.wav").write_bytes(b"not audio")
+    output = tmp_path / "results.jsonl"
+    code = main(["batch", "--benchmark", goal, "--takes", str(takes), "--output", str(output), "--workers", "1", "--no-feedback"])
+    records = {os.path.basename(record["user"]): record for record in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    assert code == 1 and set(records) == {"good.wav", "broken.wav"}
+    good, broken = records["good.wav"], records["broken.wav"]
+    assert good["ok"] and good["benchmark"] == goal and os.path.isabs(good["user"])
+    assert good["user_duration"] == pytest.approx(3.0) and good["intonation"]["vs_benchmark_cents"] == pytest.approx(20, abs=3)
+    assert not broken["ok"] and broken["error"]
+
+def test_takes_requires_benchmark(tmp_path):
+    with pytest.raises(SystemExit):
+        main(["batch", "--manifest", str(tmp_path / "pairs.csv"), "--takes", str(tmp_path)])
@@ -0,0 +1,37 @@
+import wave
+
+import numpy as np
+import pytest
+
+from audio_stream import read_pcm_window, stream_audio_features
+from waveform import compute_envelope, window_envelope
+
+RATE = 8000
+
+@pytest.fixture
+def long_wav(tmp_path):
+    # 20 minutes of a tone whose amplitude steps every second, so zoomed envelopes have visible detail
+    t = np.arange(20 * 60 * RATE)
+    samples = (0.1 + 0.8 * ((t // RATE) % 2)) * np.sin(2 * np.pi * 440 * t / RATE)
+    path = tmp_path / "long.wav"
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(RATE)
+        wf.writeframes((samples * 32767).astype("<i2").tobytes())
+    return str(path), samples.astype(np.float32)
+
+def test_streamed_zoom_uses_detail_level(long_wav):
+    path, samples = long_wav
+    features = stream_audio_features(path)
+    envelope, start, end = window_envelope(features, 1000, (600.0, 630.0))
+    assert len(envelope["max"]) == 1000
+    reference = compute_envelope(samples[600 * RATE:630 * RATE], 1000)
+    assert np.abs(envelope["max"] - reference["max"]).mean() < 0.05 # ~1 s amplitude steps resolved
+
+def test_deep_zoom_rereads_window(long_wav):
+    path, samples = long_wav
+    features = stream_audio_features(path)
+    window = read_pcm_window(path, 600.0, 601.0)
+    assert len(window) == RATE and np.allclose(window, samples[600 * RATE:601 * RATE], atol=1e-4)
+    envelope, _, _ = window_envelope(features, 1000, (600.0, 601.0), lambda s, e: read_pcm_window(path, s, e))
+    reference = compute_envelope(samples[600 * RATE:601 * RATE], 1000)
+    assert np.allclose(envelope["max"], reference["max"], atol=1e-4)
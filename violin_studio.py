@@ -0,0 +1,150 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+
+from analysis import compare_performances, extract_audio_features, get_human_comparative_analysis
+from feature_cache import FeatureCache, file_digest
+
+
+# --- HEADLESS BATCH COMPARISON ---
+# python -m violin_studio batch --benchmark goal.wav --takes student_takes/ --output results.jsonl
+# python -m violin_studio batch --manifest pairs.csv --workers 8
+# Each distinct benchmark is analysed once; every (benchmark, take) pair is then analysed and
+# compared in a process pool, and one JSON object per pair is written as soon as it finishes.
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".flac", ".ogg", ".aac"}
+_worker_cache = None
+
+def _init_worker(cache_dir):
+    global _worker_cache
+    _worker_cache = FeatureCache(max_entries=4, disk_dir=cache_dir) if cache_dir else None
+
+def _analyze_file(path):
+    start = time.perf_counter()
+    # Streaming from the path (memory-mapped for WAV, piped through ffmpeg otherwise) keeps per-worker memory
+    # flat and skips the waveform, which is only needed for plots; the cache key is hashed from the file in chunks
+    digest = file_digest(path) if _worker_cache is not None else None
+    features = extract_audio_features(str(path), streaming=True, cache=_worker_cache, digest=digest)
+    return features, time.perf_counter() - start
+
+def _jsonable(value):
+    if isinstance(value, dict): return {name: _jsonable(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple)): return [_jsonable(item) for item in value]
+    if isinstance(value, np.ndarray): return _jsonable(value.tolist())
+    if isinstance(value, np.generic): return _jsonable(value.item())
+    if isinstance(value, float) and np.isnan(value): return None # NaN is not valid JSON
+    return value
+
+def _compare_take(benchmark_path, benchmark_features, benchmark_seconds, user_path, with_feedback):
+    record = {"benchmark": benchmark_path, "user": user_path}
+    try:
+        user_features, user_seconds = _analyze_file(user_path)
+        start = time.perf_counter()
+        comparison = compare_performances(benchmark_features, user_features)
+        feedback = get_human_comparative_analysis(benchmark_features, user_features, comparison) if with_feedback else None
+        comparison_seconds = time.perf_counter() - start
+    except Exception as e:
+        record.update(ok=False, error=f"{type(e).__name__}: {e}")
+        return record
+    alignment, intonation = comparison["alignment"], comparison["intonation"]
+    n_sections = len(alignment["section_start"]) if alignment else 0
+    section_cents = intonation["section_cents"] if intonation and intonation["section_cents"] is not None else [None] * n_sections
+    record.update(
+        ok=True, benchmark_duration=benchmark_features["duration"], user_duration=user_features["duration"],
+        tempo_ratio=comparison["tempo_ratio"], dynamics_db=comparison["dynamics_db"],
+        start_offset=alignment["start_offset"] if alignment else None,
+        sections=[{"start": start, "end": end, "tempo_ratio": tempo, "dynamics_db": dynamics, "cents_vs_benchmark": cents}
+                  for start, end, tempo, dynamics, cents in zip(alignment["section_start"], alignment["section_end"], alignment["tempo_ratio"], alignment["dynamics_db"], section_cents)] if alignment else [],
+        intonation={name: value for name, value in intonation.items() if name != "section_cents"} if intonation else None,
+        timings={"benchmark_analysis_s": benchmark_seconds, "user_analysis_s": user_seconds, "comparison_s": comparison_seconds},
+    )
+    if with_feedback: record["feedback"] = feedback
+    return record
+
+# --- INPUTS ---
+def read_manifest(path):
+    # JSON Lines with "benchmark"/"user" keys, or CSV with a benchmark,user header (or two bare columns)
+    path = Path(path)
+    base = path.parent
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.suffix in (".jsonl", ".ndjson"):
+            rows = [json.loads(line) for line in f if line.strip()]
+            pairs = [(row["benchmark"], row["user"]) for row in rows]
+        else:
+            rows = [row for row in csv.reader(f) if row and not row[0].startswith("#")]
+            if rows and [cell.strip().lower() for cell in rows[0][:2]] == ["benchmark", "user"]: rows = rows[1:]
+            pairs = [(row[0].strip(), row[1].strip()) for row in rows]
+    return [(os.path.abspath(base / benchmark), os.path.abspath(base / user)) for benchmark, user in pairs]
+
+def takes_in_directory(benchmark, directory):
+    benchmark = os.path.abspath(benchmark)
+    takes = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in AUDIO_EXTENSIONS and os.path.abspath(p) != benchmark)
+    return [(benchmark, os.path.abspath(take)) for take in takes]
+
+# --- RUNNER ---
+def run_batch(pairs, output, workers=None, cache_dir=None, with_feedback=True):
+    by_benchmark = {}
+    for benchmark, user in pairs: by_benchmark.setdefault(benchmark, []).append(user)
+    failures = 0
+
+    def emit(record):
+        nonlocal failures
+        failures += not record["ok"]
+        output.write(json.dumps(_jsonable(record), ensure_ascii=False) + "\n"); output.flush()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_dir,)) as pool:
+        benchmark_jobs = {pool.submit(_analyze_file, benchmark): benchmark for benchmark in by_benchmark}
+        pending = set(benchmark_jobs)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for job in done:
+                if job not in benchmark_jobs:
+                    emit(job.result())
+                    continue
+                benchmark = benchmark_jobs[job]
+                try:
+                    features, seconds = job.result()
+                except Exception as e:
+                    for user in by_benchmark[benchmark]:
+                        emit({"benchmark": benchmark, "user": user, "ok": False, "error": f"benchmark: {type(e).__name__}: {e}"})
+                    continue
+                for user in by_benchmark[benchmark]:
+                    pending.add(pool.submit(_compare_take, benchmark, features, seconds, user, with_feedback))
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="violin_studio", description="Violin Studio command-line tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    batch = commands.add_parser("batch", help="Compare many recordings against their benchmarks and write JSON Lines.")
+    source = batch.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="CSV (benchmark,user) or JSON Lines file of pairs; relative paths are resolved against it.")
+    source.add_argument("--benchmark", help="Benchmark recording to compare every take in --takes against.")
+    batch.add_argument("--takes", help="Directory of student takes (used with --benchmark).")
+    batch.add_argument("--output", "-o", help="Write results here instead of stdout.")
+    batch.add_argument("--workers", "-j", type=int, default=None, help="Worker processes (default: all cores).")
+    batch.add_argument("--cache-dir", default=os.environ.get("VIOLIN_STUDIO_CACHE_DIR"), help="Reuse analysed features across runs via this directory.")
+    batch.add_argument("--no-feedback", action="store_true", help="Omit the human-readable feedback text.")
+    args = parser.parse_args(argv)
+
+    if args.benchmark and not args.takes: parser.error("--benchmark requires --takes")
+    if args.manifest and args.takes: parser.error("--takes can only be used with --benchmark")
+    pairs = read_manifest(args.manifest) if args.manifest else takes_in_directory(args.benchmark, args.takes)
+    if not pairs: parser.error("no recordings to compare")
+    start = time.perf_counter()
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        failures = run_batch(pairs, output, workers=args.workers, cache_dir=args.cache_dir or None, with_feedback=not args.no_feedback)
+    finally:
+        if args.output: output.close()
+    print(f"Compared {len(pairs) - failures}/{len(pairs)} recordings in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+from profiling import stage
+
+
+# --- LEVEL-OF-DETAIL WAVEFORM ENVELOPES ---
+# Instead of handing matplotlib one point per sample, the signal is reduced to a min/max/RMS
+# envelope with one bin per horizontal pixel. A fixed-resolution overview is computed once at
+# analysis time and cached with the features (streamed inputs, whose samples aren't kept, also get
+# a finer detail level). A view is drawn from the coarsest cached level that still has a bin per
+# pixel; deeper zooms re-derive only the visible window from the raw samples, or through a
+# `read_window` callback when the samples live on disk.
+
+OVERVIEW_BINS = 4096
+DETAIL_BINS = 1 << 16
+_CHUNK_BINS = 1024 # Bins reduced per pass; bounds the temporary array used for the RMS squares
+
+def compute_envelope(samples, n_bins):
+    n = len(samples)
+    n_bins = max(1, min(n_bins, n))
+    if n == 0:
+        empty = np.zeros(0, dtype=np.float32)
+        return {"min": empty, "max": empty, "rms": empty}
+    edges = np.linspace(0, n, n_bins + 1).astype(np.int64)
+    env_min = np.empty(n_bins, dtype=np.float32)
+    env_max = np.empty(n_bins, dtype=np.float32)
+    env_rms = np.empty(n_bins, dtype=np.float32)
+    for b0 in range(0, n_bins, _CHUNK_BINS):
+        b1 = min(b0 + _CHUNK_BINS, n_bins)
+        chunk = samples[edges[b0]:edges[b1]]
+        starts = edges[b0:b1] - edges[b0]
+        env_min[b0:b1] = np.minimum.reduceat(chunk, starts)
+        env_max[b0:b1] = np.maximum.reduceat(chunk, starts)
+        sums = np.add.reduceat(np.square(chunk, dtype=np.float64), starts)
+        env_rms[b0:b1] = np.sqrt(sums / np.diff(edges[b0:b1 + 1]))
+    return {"min": env_min, "max": env_max, "rms": env_rms}
+
+def downsample_envelope(envelope, n_bins):
+    # Envelope of an envelope: min of mins, max of maxes, power-mean of RMS values
+    n = len(envelope["min"])
+    if n <= n_bins: return envelope
+    edges = np.linspace(0, n, n_bins + 1).astype(np.int64)
+    starts = edges[:-1]
+    power = np.add.reduceat(np.square(envelope["rms"], dtype=np.float64), starts) / np.diff(edges)
+    return {
+        "min": np.minimum.reduceat(envelope["min"], starts),
+        "max": np.maximum.reduceat(envelope["max"], starts),
+        "rms": np.sqrt(power).astype(np.float32),
+    }
+
+def overview_envelope_features(samples):
+    envelope = compute_envelope(samples, OVERVIEW_BINS)
+    return {"envelope_min": envelope["min"], "envelope_max": envelope["max"], "envelope_rms": envelope["rms"]}
+
+def _cached_levels(features):
+    # Coarsest first
+    levels = [{"min": features["envelope_min"], "max": features["envelope_max"], "rms": features["envelope_rms"]}]
+    if "envelope_detail_min" in features:
+        levels.append({"min": features["envelope_detail_min"], "max": features["envelope_detail_max"], "rms": features["envelope_detail_rms"]})
+    return levels
+
+def _slice_level(level, start, end, duration, n_bins):
+    n = len(level["min"])
+    i0, i1 = int(start / duration * n) if duration else 0, int(np.ceil(end / duration * n)) if duration else n
+    window = {name: values[i0:max(i1, i0 + 1)] for name, values in level.items()}
+    return downsample_envelope(window, n_bins)
+
+def window_envelope(features, n_bins, time_range=None, read_window=None):
+    duration = features["duration"]
+    start, end = time_range if time_range else (0.0, duration)
+    start, end = max(0.0, start), min(duration, end)
+    end = max(start, end)
+    levels = _cached_levels(features)
+    span = (end - start) / duration if duration else 1.0
+    for level in levels:
+        if len(level["min"]) * span >= n_bins: return _slice_level(level, start, end, duration, n_bins), start, end
+    framerate = features["framerate"]
+    if features.get("waveform") is not None:
+        window = features["waveform"][int(start * framerate):int(np.ceil(end * framerate))]
+        return compute_envelope(window, n_bins), start, end
+    window = read_window(start, end) if read_window else None
+    if window is not None: return compute_envelope(window, n_bins), start, end
+    return _slice_level(levels[-1], start, end, duration, n_bins), start, end # Best available; coarser than a pixel
+
+def plot_waveform(features, title, color, time_range=None, read_window=None):
+    with stage("plot_waveform"):
+        fig, ax = plt.subplots(figsize=(10, 2))
+        width_px = int(fig.get_figwidth() * fig.dpi)
+        with stage("envelope"):
+            envelope, start, end = window_envelope(features, width_px, time_range, read_window)
+        with stage("draw", samples=len(envelope["min"])):
+            view_start, view_end = time_range if time_range else (start, end)
+            time_axis = np.linspace(start, end, num=len(envelope["min"]))
+            ax.fill_between(time_axis, envelope["min"], envelope["max"], color=color, linewidth=0, alpha=0.6)
+            ax.fill_between(time_axis, -envelope["rms"], envelope["rms"], color=color, linewidth=0)
+            ax.set_title(title, color='white'); ax.set_xlabel("Time (s)", color='white')
+            ax.set_ylabel("Amplitude", color='white'); ax.set_ylim([-1, 1]); ax.set_xlim([view_start, max(view_end, view_start + 1e-3)])
+            ax.grid(True, alpha=0.2, color='#888888'); ax.tick_params(colors='white', which='both')
+            fig.patch.set_facecolor('none'); ax.set_facecolor('none')
+        return fig